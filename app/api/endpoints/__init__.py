@@ -8,4 +8,5 @@
 from .charity_project import router as charity_project_router # noqa
 from .donation import router as donation_router # noqa
 from .google import router as google_router # noqa
+from .metrics import router as metrics_router # noqa
 from .user import router as user_router # noqa
@@ -1,19 +1,27 @@
 from http import HTTPStatus
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import (
+    APIRouter, Body, Depends, HTTPException, Query, Request, Response
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser
 from app.crud.charity_project import charity_project_crud
-from app.models import Donation
+from app.crud.donation import donation_crud
+from app.models import CharityProject
 from app.schemas.charity_project import (
     CharityProjectCreate, CharityProjectDB, CharityProjectUpdate
 )
-from app.service.constants import MIN_INVESTED_AMOUNT
-from app.service.donations import invest_funds
+from app.service.constants import (
+    MAX_BATCH_SIZE, MAX_PAGE_SIZE, MIN_INVESTED_AMOUNT
+)
+from app.service.donations import (
+    create_batch_with_investment, create_with_investment, serialized_writer
+)
+from app.service.open_pool import open_pool_cache
+from app.service.pagination import paginate
 
 
 router = APIRouter()
@@ -25,17 +33,32 @@ router = APIRouter()
     response_model_exclude_none=True,
 )
 async def get_all_charity_projects(
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    session: AsyncSession = Depends(get_async_read_session),
 ) -> List[CharityProjectDB]:
-    """Получает список всех благотворительных проектов.
+    """Получает список благотворительных проектов.
+
+    Без limit возвращает все проекты. С limit возвращает страницу
+    проектов с id больше after, а ссылка на следующую страницу
+    передается в заголовках Link и X-Next-Cursor.
 
     Args:
+        request: Текущий запрос
+        response: Ответ для заголовков постраничной выдачи
+        limit: Размер страницы (опционально)
+        after: id последнего проекта предыдущей страницы (опционально)
         session: Асинхронная сессия для работы с базой данных
 
     Returns:
-        list[CharityProjectDB]: Список всех благотворительных проектов
+        list[CharityProjectDB]: Список благотворительных проектов
     """
-    return await charity_project_crud.get_multi(session)
+    projects = await charity_project_crud.get_multi(
+        session, limit=None if limit is None else limit + 1, after=after
+    )
+    return paginate(projects, limit, request, response)
 
 
 @router.post(
@@ -70,21 +93,65 @@ async def create_charity_project(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Проект с таким именем уже существует!'
         )
-    new_project = await charity_project_crud.create(
-        project, session, commit=False
+    new_project = await create_with_investment(
+        project, charity_project_crud, donation_crud, session
     )
-    donations = await session.execute(select(Donation).where(
-        Donation.fully_invested.is_(False)
-    ).order_by(Donation.create_date))
-    donations = donations.scalars().all()
-    modified_objects = invest_funds(new_project, donations)
-    for obj in modified_objects:
-        session.add(obj)
-    await session.commit()
-    await session.refresh(new_project)
     return new_project
 
 
+@router.post(
+    '/batch',
+    response_model=List[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+)
+async def create_charity_projects_batch(
+    projects: List[CharityProjectCreate] = Body(
+        ..., min_items=1, max_items=MAX_BATCH_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session),
+) -> List[CharityProjectDB]:
+    """Создает несколько благотворительных проектов одним запросом.
+
+    Доступно только для суперпользователей. Уникальность названий
+    проверяется одним запросом для всего пакета, открытые пожертвования
+    распределяются по новым проектам за один проход, а проекты
+    сохраняются одним коммитом.
+
+    Args:
+        projects: Данные для создания проектов
+        session: Асинхронная сессия для работы с базой данных
+
+    Returns:
+        list[CharityProjectDB]: Созданные благотворительные проекты
+
+    Raises:
+        HTTPException: Если названия в пакете повторяются или проект с
+                       таким именем уже существует
+    """
+    names = [project.name for project in projects]
+    if len(set(names)) != len(names):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Названия проектов в пакете не должны повторяться!'
+        )
+    existing_names = await charity_project_crud.get_existing_names(
+        names, session
+    )
+    if existing_names:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=(
+                'Проекты с такими именами уже существуют: '
+                f'{", ".join(existing_names)}'
+            )
+        )
+    new_projects = await create_batch_with_investment(
+        projects, charity_project_crud, donation_crud, session
+    )
+    return new_projects
+
+
 @router.delete(
     '/{project_id}',
     response_model=CharityProjectDB,
@@ -117,8 +184,9 @@ async def delete_charity_project(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='В проект были внесены средства, не подлежит удалению!'
         )
-    project = await charity_project_crud.remove(project, session)
-    await session.commit()
+    async with serialized_writer(session):
+        project = await charity_project_crud.remove(project, session)
+        open_pool_cache.invalidate(CharityProject)
     return project
 
 
@@ -179,7 +247,7 @@ async def update_charity_project(
             detail=('Нельзя установить значение full_amount '
                     'меньше уже вложенной суммы.')
         )
-    project = await charity_project_crud.update(project, obj_in, session)
-    await session.commit()
-    await session.refresh(project)
+    async with serialized_writer(session):
+        project = await charity_project_crud.update(project, obj_in, session)
+        open_pool_cache.invalidate(CharityProject)
     return project
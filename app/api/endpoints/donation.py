@@ -1,15 +1,26 @@
-from typing import List
+from http import HTTPStatus
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import (
+    APIRouter, Body, Depends, HTTPException, Query, Request, Response
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_user, current_superuser
+from app.crud.charity_project import charity_project_crud
 from app.crud.donation import donation_crud
-from app.models import User, CharityProject
+from app.models import User
 from app.schemas.donation import DonationCreate, DonationDB, DonationAdminDB
-from app.service.donations import invest_funds
+from app.service.constants import (
+    MAX_BATCH_SIZE, MAX_PAGE_SIZE, STREAM_BATCH_SIZE
+)
+from app.service.donations import (
+    create_batch_with_investment, create_with_investment
+)
+from app.service.pagination import paginate
+from app.service.streaming import stream_json_array
 
 router = APIRouter()
 
@@ -21,19 +32,32 @@ router = APIRouter()
     dependencies=[Depends(current_superuser)],
 )
 async def get_all_donations(
-    session: AsyncSession = Depends(get_async_session),
-) -> List[DonationAdminDB]:
+    stream: bool = Query(False),
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Union[List[DonationAdminDB], StreamingResponse]:
     """Получает список всех пожертвований.
 
-    Доступно только для суперпользователей.
+    Доступно только для суперпользователей. С параметром stream список
+    отдается потоком: пожертвования читаются из базы пачками и
+    сериализуются в JSON-массив по мере отправки, что позволяет
+    выгружать список любой длины при постоянном расходе памяти.
 
     Args:
+        stream: Отдавать список потоком
         session: Асинхронная сессия для работы с базой данных
 
     Returns:
         list[DonationAdminDB]: Список всех пожертвований с дополнительной
                                 информацией
     """
+    if stream:
+        donations = await donation_crud.stream_multi(
+            session, STREAM_BATCH_SIZE
+        )
+        return StreamingResponse(
+            stream_json_array(donations, DonationAdminDB),
+            media_type='application/json',
+        )
     return await donation_crud.get_multi(session)
 
 
@@ -57,36 +81,88 @@ async def create_donation(
     Returns:
         DonationDB: Созданное пожертвование
     """
-    new_donation = await donation_crud.create(
-        donation, session, user, commit=False
+    new_donation = await create_with_investment(
+        donation, donation_crud, charity_project_crud, session, user
     )
-    projects = await session.execute(select(CharityProject).where(
-        CharityProject.fully_invested.is_(False)
-    ).order_by(CharityProject.create_date))
-    projects = projects.scalars().all()
-    modified_objects = invest_funds(new_donation, projects)
-    session.add_all(modified_objects)
-    await session.commit()
-    await session.refresh(new_donation)
     return new_donation
 
 
+@router.post(
+    '/batch',
+    response_model=List[DonationDB],
+    response_model_exclude_none=True,
+)
+async def create_donations_batch(
+    donations: List[DonationCreate] = Body(
+        ..., min_items=1, max_items=MAX_BATCH_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+) -> List[DonationDB]:
+    """Создает несколько пожертвований одним запросом.
+
+    Пожертвования распределяются по открытым проектам в порядке
+    следования в запросе за один проход и сохраняются одним коммитом.
+
+    Args:
+        donations: Данные для создания пожертвований
+        session: Асинхронная сессия для работы с базой данных
+        user: Текущий аутентифицированный пользователь
+
+    Returns:
+        list[DonationDB]: Созданные пожертвования
+    """
+    new_donations = await create_batch_with_investment(
+        donations, donation_crud, charity_project_crud, session, user
+    )
+    return new_donations
+
+
 @router.get(
     '/my',
     response_model=List[DonationDB],
     response_model_exclude_none=True,
 )
 async def get_user_donations(
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    session: AsyncSession = Depends(get_async_read_session),
     user: User = Depends(current_user),
 ) -> List[DonationDB]:
     """Получает список пожертвований текущего пользователя.
 
+    Без параметров пожертвования отдаются в порядке создания записей.
+    С limit возвращается страница пожертвований от новых к старым,
+    идущих после пожертвования after, а ссылка на следующую страницу
+    передается в заголовке Link.
+
     Args:
+        request: Текущий запрос
+        response: Ответ, в который добавляются заголовки пагинации
+        limit: Размер страницы (опционально)
+        after: id последнего пожертвования предыдущей страницы
+               (опционально)
         session: Асинхронная сессия для работы с базой данных
         user: Текущий аутентифицированный пользователь
 
     Returns:
         list[DonationDB]: Список пожертвований пользователя
+
+    Raises:
+        HTTPException: Если пожертвование after не найдено среди
+                       пожертвований пользователя
     """
-    return await donation_crud.get_by_user(session, user)
+    if after is not None:
+        cursor = await donation_crud.get(after, session)
+        if cursor is None or cursor.user_id != user.id:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='Пожертвование after не найдено'
+            )
+    donations = await donation_crud.get_by_user(
+        session, user,
+        limit=None if limit is None else limit + 1, after=after
+    )
+    return paginate(donations, limit, request, response)
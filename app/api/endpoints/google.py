@@ -2,10 +2,11 @@ from http import HTTPStatus
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser
-from app.crud.charity_project import charity_project_crud
-from app.service.google_api import google_api_service
+from app.schemas.report_job import ReportJobDB
+from app.service.google_report import export_report
+from app.service.report_jobs import report_jobs
 
 
 router = APIRouter()
@@ -21,26 +22,68 @@ router = APIRouter()
 )
 async def update_google_report(
     session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_async_read_session),
+    incremental: bool = False,
 ) -> dict:
-    """Обновляет отчет в существующей Google Таблице."""
+    """Обновляет отчет в существующей Google Таблице.
+
+    С параметром incremental в таблицу добавляются только проекты,
+    которых еще нет в выгруженном отчете. Инкрементальная выгрузка
+    читает основную базу данных, а полная - реплику.
+    """
     try:
-        projects = await charity_project_crud.get_projects_by_completion_rate(
-            session
+        spreadsheet_url, projects_count = await export_report(
+            session, incremental, read_session=read_session
         )
-        if not projects:
+        if spreadsheet_url is None:
             return {
                 'message': 'Нет закрытых проектов для отчета',
                 'spreadsheet_url': None,
                 'projects_count': 0
             }
-        spreadsheet_url = google_api_service.update_spreadsheet(projects)
         return {
             'message': 'Отчет успешно обновлен',
             'spreadsheet_url': spreadsheet_url,
-            'projects_count': len(projects)
+            'projects_count': projects_count
         }
     except Exception as error:
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f'Ошибка при обновлении отчета: {str(error)}'
         )
+
+
+@router.post(
+    '/jobs',
+    response_model=ReportJobDB,
+    response_model_exclude_none=True,
+    status_code=HTTPStatus.ACCEPTED,
+    dependencies=[Depends(current_superuser)],
+    summary='Поставить обновление отчета в очередь',
+    description='Обновляет отчет в фоне и сразу возвращает задачу, '
+                'статус которой можно получить по ее идентификатору'
+)
+async def create_report_job(incremental: bool = False) -> ReportJobDB:
+    """Ставит обновление отчета в очередь фоновых задач.
+
+    Пока предыдущий запрос ждет выполнения, возвращается его задача.
+    """
+    return report_jobs.submit(incremental)
+
+
+@router.get(
+    '/jobs/{job_id}',
+    response_model=ReportJobDB,
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+    summary='Получить статус обновления отчета',
+)
+async def get_report_job(job_id: str) -> ReportJobDB:
+    """Возвращает состояние задачи обновления отчета."""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Задача не найдена!'
+        )
+    return job
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.core.db import engine_metrics, read_engine_metrics
+from app.core.metrics import render_metrics
+from app.core.user import current_superuser
+from app.schemas.metrics import PoolMetricsDB
+
+
+router = APIRouter()
+
+
+@router.get(
+    '',
+    response_class=PlainTextResponse,
+    dependencies=[Depends(current_superuser)],
+    summary='Получить метрики в формате Prometheus',
+    description='Возвращает количество HTTP- и SQL-запросов и их время '
+                'по маршрутам, а также состояние пулов соединений'
+)
+async def get_metrics() -> PlainTextResponse:
+    """Возвращает метрики приложения в текстовом формате Prometheus."""
+    pool_metrics = {'primary': engine_metrics.snapshot()}
+    if read_engine_metrics is not engine_metrics:
+        pool_metrics['replica'] = read_engine_metrics.snapshot()
+    return PlainTextResponse(
+        render_metrics(pool_metrics),
+        media_type='text/plain; version=0.0.4',
+    )
+
+
+@router.get(
+    '/pool',
+    response_model=PoolMetricsDB,
+    dependencies=[Depends(current_superuser)],
+    summary='Получить состояние пула соединений',
+    description='Возвращает размер пула соединений с базой данных, '
+                'количество выданных соединений и время их ожидания'
+)
+async def get_pool_metrics() -> dict:
+    """Возвращает метрики пула соединений основного движка."""
+    return engine_metrics.snapshot()
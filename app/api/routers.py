@@ -7,7 +7,8 @@
 from fastapi import APIRouter
 
 from app.api.endpoints import (charity_project_router, donation_router,
-                               google_router, user_router)
+                               google_router, metrics_router,
+                               user_router)
 
 
 main_router = APIRouter()
@@ -24,3 +25,6 @@ main_router.include_router(user_router)
 main_router.include_router(
     google_router, prefix='/google', tags=['Google']
 )
+main_router.include_router(
+    metrics_router, prefix='/metrics', tags=['metrics']
+)
@@ -1,8 +1,8 @@
 """Экземпляр настроек приложения для использования во всем проекте."""
 
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseSettings, EmailStr
+from pydantic import BaseSettings, EmailStr, conint, validator
 
 
 class Settings(BaseSettings):
@@ -10,10 +10,33 @@ class Settings(BaseSettings):
 
     app_title: str = 'Кошачий благотворительный фонд'
     app_description: str = 'Позволяет поддержать котиков в их начинаниях'
+    debug: bool = False
     database_url: str = 'sqlite+aiosqlite:///./fastapi.db'
+    replica_url: Optional[str] = None
+    sql_echo: bool = False
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    statement_cache_size: int = 100
+    sqlite_journal_mode: Literal[
+        'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'
+    ] = 'WAL'
+    sqlite_synchronous: Literal['OFF', 'NORMAL', 'FULL', 'EXTRA'] = 'NORMAL'
+    sqlite_busy_timeout: int = 5000
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size: int = -20000
     secret: str = 'SECRET'
     first_superuser_email: Optional[EmailStr] = None
     first_superuser_password: Optional[str] = None
+    invest_batch_size: int = 50
+    invest_engine: Literal['python', 'sql'] = 'python'
+    invest_max_retries: conint(ge=1) = 3
+    web_concurrency: conint(ge=1) = 1
+    open_pool_cache: bool = False
+    open_pool_cache_ttl: float = 60
+    report_chunk_size: int = 1000
 
     type: Optional[str] = None
     project_id: Optional[str] = None
@@ -29,6 +52,28 @@ class Settings(BaseSettings):
     client_x509_cert_url: Optional[str] = None
     email: Optional[EmailStr] = None
     spreadsheet_id: Optional[str] = None
+    spreadsheet_sheet_id: int = 0
+
+    @validator('open_pool_cache')
+    def check_open_pool_cache(cls, value: bool, values: dict) -> bool:
+        """Разрешает кэш незакрытых объектов только для одного процесса.
+
+        Кэш хранится в памяти процесса и не видит записи других
+        процессов, поэтому требует SQLite и одного рабочего процесса
+        (WEB_CONCURRENCY, который читают uvicorn и gunicorn).
+        """
+        if not value:
+            return value
+        if not values.get('database_url', '').startswith('sqlite'):
+            raise ValueError(
+                'Кэш незакрытых объектов поддерживается только для SQLite'
+            )
+        if values.get('web_concurrency', 1) > 1:
+            raise ValueError(
+                'Кэш незакрытых объектов работает только с одним рабочим '
+                'процессом'
+            )
+        return value
 
     class Config:
         """Конфигурация для загрузки переменных окружения из файла."""
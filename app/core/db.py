@@ -1,10 +1,14 @@
 from typing import AsyncGenerator
 
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    create_async_engine)
 from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.pool import PoolMetrics, TimedQueuePool
 
 
 class PreBase:
@@ -19,17 +23,126 @@ class PreBase:
         """
         return cls.__name__.lower()
 
+    __mapper_args__ = {'eager_defaults': True}
+
     id: int = Column(Integer, primary_key=True)
 
 
 Base = declarative_base(cls=PreBase)
 """Базовый класс для объявления моделей с предустановленными атрибутами."""
 
-engine = create_async_engine(settings.database_url)
+
+def get_engine_options(database_url: str) -> dict:
+    """Собирает параметры движка базы данных из настроек.
+
+    Для SQLite используется пул по умолчанию: соединение с файлом
+    открывается на каждый запрос, и параметры пула к нему неприменимы.
+    Для остальных СУБД настраивается TimedQueuePool, а для asyncpg
+    дополнительно задается размер кэша подготовленных запросов
+    (0 - при работе через pgbouncer в режиме транзакций).
+
+    Args:
+        database_url: Адрес базы данных
+
+    Returns:
+        dict: Именованные аргументы для create_async_engine
+    """
+    url = make_url(database_url)
+    options = {'echo': settings.sql_echo}
+    if url.get_backend_name() == 'sqlite':
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.pool_max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+    )
+    if url.get_driver_name() == 'asyncpg':
+        options['connect_args'] = {
+            'statement_cache_size': settings.statement_cache_size,
+            'prepared_statement_cache_size': (
+                settings.statement_cache_size
+            ),
+        }
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Настраивает новое соединение с SQLite.
+
+    Журнал WAL позволяет читать базу во время записи, а режим
+    synchronous=NORMAL не синхронизирует файл с диском на каждом
+    коммите. Ожидание блокировки, размер отображаемой в память части
+    файла и размер кэша страниц берутся из настроек.
+    """
+    cursor = dbapi_connection.cursor()
+    for pragma, value in (
+        ('journal_mode', settings.sqlite_journal_mode),
+        ('synchronous', settings.sqlite_synchronous),
+        ('busy_timeout', settings.sqlite_busy_timeout),
+        ('mmap_size', settings.sqlite_mmap_size),
+        ('cache_size', settings.sqlite_cache_size),
+    ):
+        cursor.execute(f'PRAGMA {pragma} = {value}')
+    cursor.close()
+
+
+def configure_sqlite(engine: AsyncEngine) -> None:
+    """Подключает настройку соединений к движку SQLite."""
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+
+
+def build_engine(database_url: str) -> AsyncEngine:
+    """Создает асинхронный движок с параметрами из настроек.
+
+    Args:
+        database_url: Адрес базы данных
+
+    Returns:
+        AsyncEngine: Настроенный асинхронный движок
+    """
+    engine = create_async_engine(
+        database_url, **get_engine_options(database_url)
+    )
+    configure_sqlite(engine)
+    instrument_engine(engine)
+    return engine
+
+
+engine = build_engine(settings.database_url)
 """Асинхронный движок для подключения к базе данных."""
 
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
-"""Фабрика сессий для асинхронной работы с базой данных."""
+engine_metrics = PoolMetrics(engine)
+"""Метрики пула соединений основного движка."""
+
+read_engine = (
+    build_engine(settings.replica_url) if settings.replica_url else engine
+)
+"""Движок для запросов на чтение: реплика или основная база данных."""
+
+read_engine_metrics = (
+    engine_metrics if read_engine is engine else PoolMetrics(read_engine)
+)
+"""Метрики пула соединений движка для запросов на чтение."""
+
+AsyncSessionLocal = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+"""Фабрика сессий для асинхронной работы с базой данных.
+
+Объекты не сбрасываются после коммита: значения, записанные в базу,
+уже есть в памяти, а значения по умолчанию на стороне сервера
+загружаются при вставке (eager_defaults, RETURNING там, где он
+поддерживается), поэтому повторно читать записанные строки не нужно.
+"""
+
+AsyncReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
+"""Фабрика сессий для чтения из реплики базы данных."""
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
@@ -40,3 +153,18 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+async def get_async_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Генерирует асинхронную сессию только для чтения данных.
+
+    Сессия подключается к реплике из settings.replica_url, а если
+    реплика не задана - к основной базе данных. Реплика может отставать
+    от основной базы, поэтому сессия подходит только для списков
+    и отчетов, но не для чтения перед записью.
+
+    Yields:
+        AsyncSession: Асинхронная сессия для чтения из БД
+    """
+    async with AsyncReadSessionLocal() as async_session:
+        yield async_session
@@ -1,12 +1,29 @@
-"""Файл для прохождения тестов."""
+"""Клиент Google Sheets, общий для всего приложения.
 
-import gspread
-from google.oauth2.service_account import Credentials
+Учетные данные и клиент создаются при первом обращении, а не при
+импорте, и затем переиспользуются: клиент держит одну HTTP-сессию с
+пулом соединений, а токен доступа обновляется заранее, за
+GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS до истечения, поэтому запросы к
+таблицам не ждут обмена токена. Библиотеки Google тоже импортируются
+при первом обращении, чтобы не замедлять запуск приложения.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional
 
 from app.core.config import settings
-from app.service.constants import BASE_SCOPE
+from app.service.constants import (
+    BASE_SCOPE,
+    GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS,
+)
 from app.service.exceptions import GoogleSheetsServiceError
 
+if TYPE_CHECKING:
+    import gspread
+    from google.auth.transport.requests import Request
+    from google.oauth2.service_account import Credentials
+
 SCOPES = [
     f'{BASE_SCOPE}spreadsheets',
     f'{BASE_SCOPE}drive.file'
@@ -15,7 +32,10 @@ INFO = {
     'type': settings.type,
     'project_id': settings.project_id,
     'private_key_id': settings.private_key_id,
-    'private_key': settings.private_key.replace('\\n', '\n'),
+    'private_key': (
+        settings.private_key.replace('\\n', '\n')
+        if settings.private_key else None
+    ),
     'client_email': settings.client_email,
     'client_id': settings.client_id,
     'auth_uri': settings.auth_uri,
@@ -25,19 +45,89 @@ INFO = {
     ),
     'client_x509_cert_url': settings.client_x509_cert_url,
 }
+REQUIRED_INFO_FIELDS = (
+    'type', 'project_id', 'private_key_id', 'private_key', 'client_email'
+)
+
+
+class GoogleClientProvider:
+    """Лениво создает и переиспользует клиент Google Sheets.
+
+    Клиент используется из пула потоков, поэтому создание клиента и
+    обновление токена защищены блокировкой.
+    """
+
+    def __init__(self, info: dict, scopes: list[str]):
+        self.info = info
+        self.scopes = scopes
+        self._client: Optional['gspread.Client'] = None
+        self._auth_request: Optional['Request'] = None
+        self._lock = threading.Lock()
+
+    def _create_client(self) -> 'gspread.Client':
+        """Создает учетные данные и авторизованный клиент."""
+        import gspread
+        import requests
+        from google.auth.transport.requests import Request
+        from google.oauth2.service_account import Credentials
+
+        for field in REQUIRED_INFO_FIELDS:
+            if not self.info.get(field):
+                raise GoogleSheetsServiceError(
+                    f'Отсутствует обязательное поле: {field}'
+                )
+        credentials = Credentials.from_service_account_info(
+            self.info, scopes=self.scopes
+        )
+        self._auth_request = Request(requests.Session())
+        return gspread.Client(auth=credentials)
+
+    @staticmethod
+    def _expires_soon(credentials: 'Credentials') -> bool:
+        """Проверяет, нужно ли обновить токен доступа."""
+        if not credentials.valid:
+            return True
+        if credentials.expiry is None:
+            return False
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - now < timedelta(
+            seconds=GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS
+        )
+
+    def get_client(self) -> 'gspread.Client':
+        """Возвращает клиент с действующим токеном доступа.
+
+        Returns:
+            gspread.Client: Общий клиент Google Sheets
+
+        Raises:
+            GoogleSheetsServiceError: Если учетные данные не заданы
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = self._create_client()
+            if self._expires_soon(self._client.auth):
+                self._client.auth.refresh(self._auth_request)
+            return self._client
+
+    def reset(self) -> None:
+        """Сбрасывает клиент, чтобы он был создан заново."""
+        with self._lock:
+            self._client = None
+
+
+google_client_provider = GoogleClientProvider(INFO, SCOPES)
 
 
 async def get_service():
     """Асинхронный генератор для получения Google Sheets сервиса."""
     try:
-        creds = Credentials.from_service_account_info(INFO)
-        creds = creds.with_scopes(SCOPES)
-        client = gspread.authorize(creds)
-        yield client
+        client = google_client_provider.get_client()
     except Exception as e:
         raise GoogleSheetsServiceError(
             f'Ошибка создания Google сервиса: {str(e)}'
         )
+    yield client
 
 
 google_client = get_service()
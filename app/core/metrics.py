@@ -0,0 +1,266 @@
+"""Статистика запросов к базе данных в разрезе HTTP-запросов.
+
+Обработчики событий движка считают SQL-запросы и время их выполнения
+для текущего HTTP-запроса, который хранится в контекстной переменной.
+Middleware собирает статистику по маршрутам, а в режиме отладки
+добавляет ее в заголовки ответа. Накопленные значения отдаются
+в текстовом формате Prometheus.
+"""
+
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import (
+    AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+)
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.routing import Match
+
+from app.core.config import settings
+
+QUERY_START_KEY = 'query_start'
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RequestStats:
+    """SQL-запросы, выполненные при обработке одного HTTP-запроса."""
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        """Учитывает выполненный SQL-запрос."""
+        self.statements += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+class RouteStats:
+    """Накопленная статистика HTTP-запросов одного маршрута."""
+
+    def __init__(self):
+        self.requests = 0
+        self.request_seconds = 0.0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+
+    def add(self, stats: RequestStats, request_seconds: float) -> None:
+        """Добавляет статистику завершенного HTTP-запроса."""
+        self.requests += 1
+        self.request_seconds += request_seconds
+        self.statements += stats.statements
+        self.db_seconds += stats.db_seconds
+        self.slowest_seconds = max(
+            self.slowest_seconds, stats.slowest_seconds
+        )
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    'current_request_stats', default=None
+)
+"""Статистика HTTP-запроса, который обрабатывается в текущем контексте."""
+
+route_stats: Dict[Tuple[str, str], RouteStats] = defaultdict(RouteStats)
+"""Статистика по методу и шаблону пути маршрута."""
+
+
+def _record_statement(conn, statement: str) -> None:
+    """Учитывает запрос, начатый на соединении, если он еще не учтен."""
+    started = conn.info.pop(QUERY_START_KEY, None)
+    if started is None:
+        return
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    conn.info[QUERY_START_KEY] = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    _record_statement(conn, statement)
+
+
+def _handle_error(exception_context) -> None:
+    if exception_context.connection is not None:
+        _record_statement(
+            exception_context.connection, exception_context.statement
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключает учет SQL-запросов к движку.
+
+    Время начала запроса хранится в одном слоте соединения. Запрос,
+    завершившийся ошибкой (например, конфликтом блокировок перед
+    повтором), тоже учитывается и освобождает слот в handle_error.
+    Повторный вызов для того же движка ничего не меняет.
+    """
+    sync_engine = engine.sync_engine
+    if event.contains(
+        sync_engine, 'before_cursor_execute', _before_cursor_execute
+    ):
+        return
+    event.listen(
+        sync_engine, 'before_cursor_execute', _before_cursor_execute
+    )
+    event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(sync_engine, 'handle_error', _handle_error)
+
+
+def _get_route_path(request: Request) -> str:
+    """Возвращает шаблон пути маршрута, обрабатывающего запрос."""
+    for route in request.app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+async def collect_request_metrics(
+    request: Request,
+    call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    """Собирает статистику SQL-запросов для HTTP-запроса.
+
+    Статистика маршрута учитывается после отправки тела ответа,
+    поэтому в нее попадают и запросы, выполненные при потоковой
+    выдаче. Обработчик выполняется в копии контекста с той же
+    статистикой, поэтому переменную контекста можно сбросить сразу
+    после получения ответа.
+
+    При settings.debug количество запросов, их суммарное время и время
+    самого медленного запроса в миллисекундах передаются в заголовках
+    X-DB-Statements, X-DB-Time и X-DB-Slowest-Time. Заголовки
+    отправляются до тела ответа и не учитывают запросы потоковой
+    выдачи.
+
+    Args:
+        request: Текущий запрос
+        call_next: Следующий обработчик запроса
+
+    Returns:
+        Response: Ответ обработчика
+    """
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_request_stats.reset(token)
+    if settings.debug:
+        response.headers['X-DB-Statements'] = str(stats.statements)
+        response.headers['X-DB-Time'] = f'{stats.db_seconds * 1000:.3f}'
+        response.headers['X-DB-Slowest-Time'] = (
+            f'{stats.slowest_seconds * 1000:.3f}'
+        )
+    route_path = _get_route_path(request)
+    body_iterator = response.body_iterator
+
+    async def record_after_body() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            route_stats[request.method, route_path].add(
+                stats, time.perf_counter() - started
+            )
+
+    response.body_iterator = record_after_body()
+    return response
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            value.replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in labels.items()
+    ) + '}'
+
+
+def _format_metric(
+    name: str,
+    metric_type: str,
+    description: str,
+    samples: Iterable[Tuple[Dict[str, str], float]],
+) -> str:
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} {metric_type}']
+    lines.extend(
+        f'{name}{_format_labels(labels)} {value}'
+        for labels, value in samples
+    )
+    return '\n'.join(lines)
+
+
+def render_metrics(pool_metrics: Dict[str, dict]) -> str:
+    """Формирует метрики в текстовом формате Prometheus.
+
+    Args:
+        pool_metrics: Снимки состояния пулов соединений по имени движка
+
+    Returns:
+        str: Метрики маршрутов и пулов соединений
+    """
+    routes = [
+        ({'method': method, 'route': path}, stats)
+        for (method, path), stats in sorted(route_stats.items())
+    ]
+    pools = [
+        ({'engine': name}, snapshot)
+        for name, snapshot in pool_metrics.items()
+    ]
+    metrics = [
+        ('qrkot_http_requests_total', 'counter',
+         'Количество обработанных HTTP-запросов',
+         [(labels, stats.requests) for labels, stats in routes]),
+        ('qrkot_http_request_seconds_total', 'counter',
+         'Суммарное время обработки HTTP-запросов',
+         [(labels, stats.request_seconds) for labels, stats in routes]),
+        ('qrkot_db_statements_total', 'counter',
+         'Количество SQL-запросов',
+         [(labels, stats.statements) for labels, stats in routes]),
+        ('qrkot_db_seconds_total', 'counter',
+         'Суммарное время выполнения SQL-запросов',
+         [(labels, stats.db_seconds) for labels, stats in routes]),
+        ('qrkot_db_slowest_statement_seconds', 'gauge',
+         'Время самого медленного SQL-запроса',
+         [(labels, stats.slowest_seconds) for labels, stats in routes]),
+        ('qrkot_db_pool_checked_out', 'gauge',
+         'Количество выданных из пула соединений',
+         [(labels, pool['checked_out']) for labels, pool in pools]),
+        ('qrkot_db_pool_overflow', 'gauge',
+         'Количество соединений сверх размера пула',
+         [(labels, pool['overflow']) for labels, pool in pools
+          if pool['overflow'] is not None]),
+        ('qrkot_db_pool_checkouts_total', 'counter',
+         'Количество выдач соединений из пула',
+         [(labels, pool['checkouts']) for labels, pool in pools]),
+        ('qrkot_db_pool_wait_seconds_total', 'counter',
+         'Суммарное время ожидания соединения из пула',
+         [(labels, pool['wait_seconds_total']) for labels, pool in pools]),
+        ('qrkot_db_pool_wait_seconds_max', 'gauge',
+         'Максимальное время ожидания соединения из пула',
+         [(labels, pool['wait_seconds_max']) for labels, pool in pools]),
+    ]
+    return '\n'.join(
+        _format_metric(*metric) for metric in metrics
+    ) + '\n'
@@ -0,0 +1,78 @@
+"""Метрики пула соединений с базой данных."""
+
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, измеряющий время ожидания соединения."""
+
+    metrics: Optional['PoolMetrics'] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started)
+
+    def recreate(self) -> 'TimedQueuePool':
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class PoolMetrics:
+    """Счетчики выдачи соединений из пула одного движка.
+
+    Выданные соединения считаются по событиям checkout и checkin пула.
+    Время ожидания соединения измеряется только для TimedQueuePool,
+    который используется для всех СУБД, кроме SQLite.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.checked_out = 0
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        event.listen(engine.sync_engine, 'checkout', self._on_checkout)
+        event.listen(engine.sync_engine, 'checkin', self._on_checkin)
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = self
+
+    def _on_checkout(self, dbapi_connection, connection_record, proxy):
+        self.checked_out += 1
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checked_out -= 1
+
+    def record_wait(self, seconds: float) -> None:
+        """Учитывает время ожидания соединения из пула."""
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> dict:
+        """Возвращает текущее состояние пула.
+
+        Returns:
+            dict: Размер пула, число выданных соединений и соединений
+                  сверх размера пула, а также статистика ожидания
+        """
+        pool = self.engine.pool
+        is_queue_pool = isinstance(pool, QueuePool)
+        return {
+            'pool_class': type(pool).__name__,
+            'size': pool.size() if is_queue_pool else None,
+            'overflow': max(pool.overflow(), 0) if is_queue_pool else None,
+            'checked_out': self.checked_out,
+            'checkouts': self.checkouts,
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_max': self.wait_seconds_max,
+        }
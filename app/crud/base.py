@@ -1,18 +1,25 @@
-from typing import Optional, Any, List, Type, TypeVar
+from typing import Optional, Any, Dict, List, Type, TypeVar
 
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncScalarResult
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import ColumnElement, Select
 
 from app.models import User
 
 
 ModelType = TypeVar('ModelType')
 
+INVESTMENT_FIELDS = ('invested_amount', 'fully_invested', 'close_date')
+
 
 class CRUDBase:
     """Базовый класс для CRUD-операций с моделями."""
 
+    investment_fields = INVESTMENT_FIELDS
+
     def __init__(self, model: Type[ModelType]):
         """Инициализирует CRUD-класс с указанной моделью.
 
@@ -21,6 +28,20 @@ class CRUDBase:
         """
         self.model = model
 
+    def get_closing_values(self, close_date: ColumnElement) -> dict:
+        """Возвращает значения, вычисляемые в базе при закрытии объекта.
+
+        Используется в UPDATE, которые распределяют средства в базе
+        данных без загрузки объектов.
+
+        Args:
+            close_date: Выражение новой даты закрытия или NULL
+
+        Returns:
+            dict: Дополнительные значения для SET
+        """
+        return {}
+
     async def get(
             self,
             obj_id: int,
@@ -43,20 +64,237 @@ class CRUDBase:
         return db_obj.scalars().first()
 
     async def get_multi(
+            self,
+            session: AsyncSession,
+            limit: Optional[int] = None,
+            after: Optional[int] = None,
+    ) -> List[ModelType]:
+        """Получает объекты модели в порядке id.
+
+        Постраничная выдача построена на курсоре по первичному ключу,
+        поэтому стоимость запроса зависит от размера страницы, а не от
+        ее номера.
+
+        Args:
+            session: Асинхронная сессия базы данных
+            limit: Максимальное количество объектов (опционально)
+            after: id, после которого начинается выдача (опционально)
+
+        Returns:
+            List: Список объектов модели
+        """
+        stmt = select(self.model).order_by(self.model.id)
+        if after is not None:
+            stmt = stmt.where(self.model.id > after)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        db_objs = await session.execute(stmt)
+        return db_objs.scalars().all()
+
+    async def stream_multi(
+            self,
+            session: AsyncSession,
+            batch_size: int
+    ) -> AsyncScalarResult:
+        """Открывает курсор по всем объектам модели в порядке id.
+
+        Args:
+            session: Асинхронная сессия базы данных
+            batch_size: Количество строк, выбираемых за один раз
+
+        Returns:
+            AsyncScalarResult: Потоковый результат с объектами модели
+        """
+        return await session.stream_scalars(
+            select(self.model).order_by(self.model.id).execution_options(
+                yield_per=batch_size
+            )
+        )
+
+    def get_open_objects_query(self) -> Select:
+        """Строит запрос незакрытых объектов в порядке их создания.
+
+        Запрос обслуживается индексом по (fully_invested, create_date).
+
+        Returns:
+            Select: Запрос незакрытых объектов модели
+        """
+        return select(self.model).where(
+            self.model.fully_invested.is_(False)
+        ).order_by(self.model.create_date, self.model.id)
+
+    async def get_open_objects(
             self,
             session: AsyncSession
     ) -> List[ModelType]:
-        """Получает все объекты модели.
+        """Получает незакрытые объекты модели в порядке их создания.
 
         Args:
             session: Асинхронная сессия базы данных
 
         Returns:
-            List: Список всех объектов модели
+            List: Список незакрытых объектов модели
         """
-        db_objs = await session.execute(select(self.model))
+        db_objs = await session.execute(self.get_open_objects_query())
         return db_objs.scalars().all()
 
+    async def stream_open_objects(
+            self,
+            session: AsyncSession,
+            batch_size: int
+    ) -> AsyncScalarResult:
+        """Открывает курсор по незакрытым объектам модели.
+
+        Строки выбираются из базы пачками по batch_size, поэтому
+        загружаются только те объекты, до которых дошел перебор.
+        Выбранные строки блокируются (FOR UPDATE SKIP LOCKED), а строки,
+        заблокированные другими транзакциями, пропускаются; SQLite
+        блокировки строк не поддерживает и выполняет запрос без них.
+        Закрыть результат должен вызывающий код.
+
+        Пропуск заблокированных строк нарушает порядок FIFO: пока
+        старые объекты заблокированы параллельной транзакцией, средства
+        распределяются в более новые. Строгий порядок сохраняет
+        settings.invest_engine == 'sql', который ждет блокировки
+        старейших объектов.
+
+        Args:
+            session: Асинхронная сессия базы данных
+            batch_size: Количество строк, выбираемых за один раз
+
+        Returns:
+            AsyncScalarResult: Потоковый результат с объектами модели
+        """
+        return await session.stream_scalars(
+            self.get_open_objects_query().with_for_update(
+                skip_locked=True
+            ).execution_options(yield_per=batch_size)
+        )
+
+    async def bulk_update_investment(
+            self,
+            db_objs: List[ModelType],
+            session: AsyncSession,
+    ) -> None:
+        """Записывает результаты инвестирования одним executemany.
+
+        Вместо отдельного UPDATE на каждый объект изменения полей
+        invested_amount, fully_invested и close_date отправляются
+        одним запросом, после чего история этих полей в сессии
+        помечается сохраненной, чтобы flush не повторил обновление.
+
+        Args:
+            db_objs: Уже сохраненные объекты модели с новыми значениями
+            session: Асинхронная сессия базы данных
+        """
+        if not db_objs:
+            return
+        table = self.model.__table__
+        stmt = update(table).where(
+            table.c.id == bindparam('obj_id')
+        ).values(
+            {field: bindparam(field) for field in self.investment_fields}
+        )
+        params = []
+        for db_obj in db_objs:
+            obj_params = {
+                field: getattr(db_obj, field)
+                for field in self.investment_fields
+            }
+            obj_params['obj_id'] = db_obj.id
+            params.append(obj_params)
+        await session.execute(stmt, params)
+        for db_obj in db_objs:
+            for field in self.investment_fields:
+                set_committed_value(db_obj, field, getattr(db_obj, field))
+
+    async def get_open_pool_rows(
+            self,
+            session: AsyncSession
+    ) -> List[Row]:
+        """Получает компактное описание незакрытых объектов модели.
+
+        Args:
+            session: Асинхронная сессия базы данных
+
+        Returns:
+            List[Row]: Строки (id, remaining, create_date) в порядке
+                       создания, где remaining - нераспределенный остаток
+        """
+        rows = await session.execute(
+            select(
+                self.model.id,
+                (
+                    self.model.full_amount -
+                    func.coalesce(self.model.invested_amount, 0)
+                ).label('remaining'),
+                self.model.create_date,
+            ).where(
+                self.model.fully_invested.is_(False)
+            ).order_by(self.model.create_date, self.model.id)
+        )
+        return rows.all()
+
+    async def apply_investment_deltas(
+            self,
+            changes: List[Dict[str, Any]],
+            session: AsyncSession,
+    ) -> bool:
+        """Добавляет распределенные суммы к незакрытым объектам.
+
+        Каждое изменение применяется, только если остаток объекта в базе
+        совпадает с ожидаемым, поэтому расхождение с закэшированным
+        состоянием обнаруживается без предварительного чтения. Если
+        драйвер не сообщает число строк для executemany, остатки
+        проверяются одним запросом с блокировкой строк.
+
+        Args:
+            changes: Словари с ключами obj_id, expected (ожидаемый
+                     остаток), amount (добавляемая сумма), closed
+                     (закрывается ли объект) и close_date (время
+                     закрытия или None)
+            session: Асинхронная сессия базы данных
+
+        Returns:
+            bool: True, если все объекты найдены с ожидаемым остатком
+        """
+        if not changes:
+            return True
+        table = self.model.__table__
+        invested = func.coalesce(table.c.invested_amount, 0)
+        is_expected = table.c.full_amount - invested == bindparam('expected')
+        dialect = session.sync_session.get_bind().dialect
+        if not dialect.supports_sane_multi_rowcount:
+            expected = {change['obj_id']: change['expected']
+                        for change in changes}
+            rows = await session.execute(
+                select(table.c.id, table.c.full_amount - invested).where(
+                    table.c.id.in_(expected),
+                    table.c.fully_invested.is_(False),
+                ).with_for_update()
+            )
+            if dict(rows.all()) != expected:
+                return False
+        close_date = func.coalesce(
+            bindparam('close_date', type_=table.c.close_date.type),
+            table.c.close_date,
+        )
+        stmt = update(table).where(
+            table.c.id == bindparam('obj_id'),
+            table.c.fully_invested.is_(False),
+            is_expected,
+        ).values(
+            invested_amount=invested + bindparam('amount'),
+            fully_invested=bindparam('closed'),
+            close_date=close_date,
+            **self.get_closing_values(close_date),
+        )
+        result = await session.execute(stmt, changes)
+        return (
+            not dialect.supports_sane_multi_rowcount or
+            result.rowcount == len(changes)
+        )
+
     async def create(
             self,
             obj_in: Any,
@@ -83,7 +321,6 @@ class CRUDBase:
         session.add(db_obj)
         if commit:
             await session.commit()
-            await session.refresh(db_obj)
         return db_obj
 
     async def update(
@@ -109,7 +346,6 @@ class CRUDBase:
                 setattr(db_obj, field, update_data[field])
         session.add(db_obj)
         await session.commit()
-        await session.refresh(db_obj)
         return db_obj
 
     async def remove(
@@ -1,14 +1,17 @@
 from datetime import timedelta
-from typing import Optional
-from operator import itemgetter
+from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement, Select
 
-from app.crud.base import CRUDBase
+from app.crud.base import INVESTMENT_FIELDS, CRUDBase
+from app.crud.expressions import seconds_between
 from app.models import CharityProject
 from app.schemas.charity_project import CharityProjectReport
 from app.service.constants import (
+    IN_QUERY_CHUNK_SIZE,
     SECONDS_IN_HOUR,
     SECONDS_IN_MINUTE,
 )
@@ -17,6 +20,22 @@ from app.service.constants import (
 class CRUDCharityProject(CRUDBase):
     """CRUD-операции для модели CharityProject."""
 
+    investment_fields = INVESTMENT_FIELDS + ('collection_seconds',)
+    report_columns = (
+        CharityProject.id,
+        CharityProject.name,
+        CharityProject.description,
+        CharityProject.invested_amount,
+        CharityProject.close_date,
+        CharityProject.collection_seconds,
+    )
+
+    def get_closing_values(self, close_date: ColumnElement) -> dict:
+        """Вычисляет время сбора средств закрываемых проектов."""
+        return {'collection_seconds': seconds_between(
+            close_date, CharityProject.create_date
+        )}
+
     async def get_project_id_by_name(
         self, project_name: str, session: AsyncSession
     ) -> Optional[int]:
@@ -36,41 +55,122 @@ class CRUDCharityProject(CRUDBase):
         )
         return db_project_id.scalars().first()
 
-    async def get_projects_by_completion_rate(
-        self, session: AsyncSession
-    ) -> list[CharityProjectReport]:
-        """Получает закрытые проекты, отсортированные по скорости закрытия."""
-        stmt = select(CharityProject).where(
-            CharityProject.fully_invested.is_(True)
-        )
-        db_projects = await session.execute(stmt)
-        projects = db_projects.scalars().all()
-        projects_with_time = []
-        for project in projects:
-            if project.close_date and project.create_date:
-                time_diff = project.close_date - project.create_date
-                collection_time = self._format_time_delta(time_diff)
-                close_date_str = project.close_date.strftime('%Y-%m-%d %H:%M')
-                projects_with_time.append({
-                    'project': project,
-                    'collection_time': collection_time,
-                    'close_date_str': close_date_str,
-                    'time_seconds': time_diff.total_seconds()
-                })
-        projects_with_time.sort(key=itemgetter('time_seconds'))
-        report_projects = []
-        for item in projects_with_time:
-            project = item['project']
-            report_projects.append(
-                CharityProjectReport(
-                    name=project.name,
-                    collection_time=item['collection_time'],
-                    description=project.description,
-                    collected_amount=project.invested_amount,
-                    close_date=item['close_date_str']
+    async def get_existing_names(
+        self, project_names: List[str], session: AsyncSession
+    ) -> List[str]:
+        """Получает названия из списка, уже занятые другими проектами.
+
+        Названия проверяются частями по IN_QUERY_CHUNK_SIZE, чтобы
+        число параметров запроса не превышало ограничение SQLite.
+
+        Args:
+            project_names: Названия проектов для проверки
+            session: Асинхронная сессия базы данных
+
+        Returns:
+            List[str]: Названия, для которых проект уже существует
+        """
+        existing_names = []
+        for start in range(0, len(project_names), IN_QUERY_CHUNK_SIZE):
+            db_names = await session.execute(
+                select(CharityProject.name).where(
+                    CharityProject.name.in_(
+                        project_names[start:start + IN_QUERY_CHUNK_SIZE]
+                    )
                 )
             )
-        return report_projects
+            existing_names.extend(db_names.scalars().all())
+        return existing_names
+
+    def get_report_query(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None
+    ) -> Select:
+        """Формирует запрос строк отчета по закрытым проектам.
+
+        Время сбора хранится в колонке collection_seconds, которая
+        заполняется при закрытии проекта, поэтому запрос читает индекс
+        по (collection_seconds, id) в порядке отчета. Выбираются только
+        колонки, нужные для отчета.
+
+        Args:
+            limit: Количество самых быстрых проектов (опционально)
+            after: Ключ сортировки (collection_seconds, id) строки,
+                   после которой начинается выборка (опционально)
+
+        Returns:
+            Select: Запрос строк отчета в порядке времени сбора
+        """
+        stmt = select(*self.report_columns).where(
+            CharityProject.collection_seconds.is_not(None)
+        ).order_by(
+            CharityProject.collection_seconds, CharityProject.id
+        ).limit(limit)
+        if after is not None:
+            after_seconds, after_id = after
+            stmt = stmt.where(or_(
+                CharityProject.collection_seconds > after_seconds,
+                and_(
+                    CharityProject.collection_seconds == after_seconds,
+                    CharityProject.id > after_id
+                )
+            ))
+        return stmt
+
+    async def get_report_rows(
+        self,
+        session: AsyncSession,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None
+    ) -> List[Row]:
+        """Получает строки отчета по закрытым проектам.
+
+        Args:
+            session: Асинхронная сессия базы данных
+            limit: Количество самых быстрых проектов (опционально)
+            after: Ключ сортировки строки, после которой начинается
+                   выборка (опционально)
+
+        Returns:
+            List[Row]: Строки отчета в порядке времени сбора
+        """
+        rows = await session.execute(self.get_report_query(limit, after))
+        return rows.all()
+
+    @staticmethod
+    def get_report_sort_key(row: Row) -> tuple:
+        """Ключ сортировки строки отчета: время сбора и id."""
+        return row.collection_seconds, row.id
+
+    def build_report(self, row: Row) -> CharityProjectReport:
+        """Формирует строку отчета по закрытому проекту."""
+        return CharityProjectReport(
+            name=row.name,
+            collection_time=self._format_time_delta(
+                timedelta(seconds=round(row.collection_seconds, 3))
+            ),
+            description=row.description,
+            collected_amount=row.invested_amount,
+            close_date=row.close_date.strftime('%Y-%m-%d %H:%M')
+        )
+
+    async def get_projects_by_completion_rate(
+        self, session: AsyncSession, limit: Optional[int] = None
+    ) -> list[CharityProjectReport]:
+        """Получает закрытые проекты, отсортированные по скорости закрытия.
+
+        Args:
+            session: Асинхронная сессия базы данных
+            limit: Количество самых быстрых проектов (опционально)
+
+        Returns:
+            list[CharityProjectReport]: Строки отчета
+        """
+        return [
+            self.build_report(row)
+            for row in await self.get_report_rows(session, limit=limit)
+        ]
 
     def _format_time_delta(self, td: timedelta) -> str:
         """Форматирует timedelta в читаемый вид."""
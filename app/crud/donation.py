@@ -1,7 +1,8 @@
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from app.crud.base import CRUDBase
 from app.models import Donation, User
@@ -10,22 +11,74 @@ from app.models import Donation, User
 class CRUDDonation(CRUDBase):
     """CRUD-операции для модели Donation."""
 
+    def get_by_user_query(
+        self,
+        user: User,
+        limit: Optional[int] = None,
+        after: Optional[int] = None
+    ) -> Select:
+        """Формирует запрос страницы пожертвований пользователя.
+
+        Постраничная выдача (с limit или after) упорядочена от новых
+        к старым по (create_date, id) и обслуживается индексом по
+        (user_id, create_date, id). Курсором служит id последнего
+        пожертвования предыдущей страницы: выбираются пожертвования,
+        идущие после него в этом порядке. Без limit и after, как и
+        раньше, возвращаются все пожертвования в порядке id.
+
+        Args:
+            user: Пользователь, чьи пожертвования нужно получить
+            limit: Максимальное количество пожертвований (опционально)
+            after: id пожертвования, после которого начинается выборка
+                   (опционально)
+
+        Returns:
+            Select: Запрос пожертвований пользователя
+        """
+        query = select(self.model).where(
+            self.model.user_id == user.id
+        )
+        if limit is None and after is None:
+            return query.order_by(self.model.id)
+        query = query.order_by(
+            self.model.create_date.desc(), self.model.id.desc()
+        ).limit(limit)
+        if after is not None:
+            cursor_date = select(self.model.create_date).where(
+                self.model.id == after,
+                self.model.user_id == user.id
+            ).scalar_subquery()
+            query = query.where(or_(
+                self.model.create_date < cursor_date,
+                and_(
+                    self.model.create_date == cursor_date,
+                    self.model.id < after
+                )
+            ))
+        return query
+
     async def get_by_user(
-        self, session: AsyncSession, user: User
+        self,
+        session: AsyncSession,
+        user: User,
+        limit: Optional[int] = None,
+        after: Optional[int] = None
     ) -> List[Donation]:
-        """Получает все пожертвования, сделанные указанным пользователем.
+        """Получает пожертвования, сделанные указанным пользователем.
 
         Args:
             session: Асинхронная сессия базы данных
             user: Пользователь, чьи пожертвования нужно получить
+            limit: Максимальное количество пожертвований (опционально)
+            after: id пожертвования, после которого начинается выборка
+                   (опционально)
 
         Returns:
-            List[Donation]: Список пожертвований пользователя
+            List[Donation]: Список пожертвований пользователя от новых
+                            к старым
         """
         donations = await session.execute(
-            select(self.model).where(
-                self.model.user_id == user.id
-            )
+            self.get_by_user_query(user, limit, after)
         )
         return donations.scalars().all()
 
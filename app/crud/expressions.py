@@ -0,0 +1,35 @@
+"""SQL-выражения, которые компилируются по-разному для разных СУБД."""
+
+from sqlalchemy import Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class seconds_between(FunctionElement):
+    """Количество секунд между двумя датами: end - start.
+
+    В PostgreSQL вычисляется через EXTRACT(EPOCH FROM ...), в SQLite
+    и остальных СУБД - через разность julianday.
+    """
+
+    type = Float()
+    name = 'seconds_between'
+    inherit_cache = True
+
+
+@compiles(seconds_between)
+def _compile_seconds_between(element, compiler, **kw) -> str:
+    """Компилирует seconds_between через julianday (SQLite)."""
+    end, start = (
+        compiler.process(clause, **kw) for clause in element.clauses
+    )
+    return f'((julianday({end}) - julianday({start})) * 86400.0)'
+
+
+@compiles(seconds_between, 'postgresql')
+def _compile_seconds_between_postgresql(element, compiler, **kw) -> str:
+    """Компилирует seconds_between через EXTRACT(EPOCH FROM ...)."""
+    end, start = (
+        compiler.process(clause, **kw) for clause in element.clauses
+    )
+    return f'EXTRACT(EPOCH FROM ({end} - {start}))'
@@ -0,0 +1,164 @@
+from typing import List, Optional
+
+from sqlalchemy import delete, exists, func, insert, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.crud.base import CRUDBase
+from app.crud.charity_project import charity_project_crud
+from app.models import CharityProject, ReportExport, ReportExportRow
+
+
+class CRUDReportExport(CRUDBase):
+    """CRUD-операции для состояния выгруженных отчетов."""
+
+    async def get_by_sheet(
+        self, spreadsheet_id: str, sheet_id: int, session: AsyncSession
+    ) -> Optional[ReportExport]:
+        """Получает состояние отчета, выгруженного в лист таблицы.
+
+        Args:
+            spreadsheet_id: ID таблицы
+            sheet_id: ID листа
+            session: Асинхронная сессия базы данных
+
+        Returns:
+            Optional[ReportExport]: Состояние отчета, если он выгружен
+        """
+        export = await session.execute(
+            select(ReportExport).where(
+                ReportExport.spreadsheet_id == spreadsheet_id,
+                ReportExport.sheet_id == sheet_id
+            )
+        )
+        return export.scalars().first()
+
+    async def create_for_sheet(
+        self, spreadsheet_id: str, sheet_id: int, session: AsyncSession
+    ) -> ReportExport:
+        """Создает пустое состояние отчета для листа таблицы."""
+        export = ReportExport(
+            spreadsheet_id=spreadsheet_id, sheet_id=sheet_id, rows_count=0
+        )
+        session.add(export)
+        await session.commit()
+        return export
+
+    async def remove_by_sheet(
+        self, spreadsheet_id: str, sheet_id: int, session: AsyncSession
+    ) -> None:
+        """Удаляет состояние отчета листа вместе с его строками."""
+        export = await self.get_by_sheet(spreadsheet_id, sheet_id, session)
+        if export is None:
+            return
+        await session.execute(
+            delete(ReportExportRow).where(
+                ReportExportRow.export_id == export.id
+            )
+        )
+        await session.delete(export)
+        await session.commit()
+
+    async def add_rows(
+        self,
+        export: ReportExport,
+        projects: List[Row],
+        session: AsyncSession,
+        rows_count: Optional[int] = None
+    ) -> bool:
+        """Запоминает проекты, записанные на лист.
+
+        Количество строк на листе меняется условным UPDATE: если его
+        уже изменил другой процесс, строки не сохраняются, а
+        расхождение с листом приведет к полной выгрузке.
+
+        Args:
+            export: Состояние отчета
+            projects: Записанные строки отчета
+            session: Асинхронная сессия базы данных
+            rows_count: Новое количество строк проектов на листе
+                        (опционально, по умолчанию не меняется)
+
+        Returns:
+            bool: Сохранены ли строки
+        """
+        if rows_count is not None:
+            updated = await session.execute(
+                update(ReportExport).where(
+                    ReportExport.id == export.id,
+                    ReportExport.rows_count == export.rows_count
+                ).values(rows_count=rows_count)
+            )
+            if updated.rowcount != 1:
+                await session.rollback()
+                return False
+            export.rows_count = rows_count
+        if projects:
+            await session.execute(insert(ReportExportRow), [
+                {
+                    'export_id': export.id,
+                    'project_id': project.id,
+                    'collection_seconds': project.collection_seconds,
+                }
+                for project in projects
+            ])
+        await session.commit()
+        return True
+
+    def get_unexported_query(self, export_id: int) -> Select:
+        """Формирует запрос закрытых проектов, которых еще нет в отчете.
+
+        Новые проекты определяются разностью закрытых проектов и
+        выгруженных строк, а не по дате закрытия, поэтому проекты из
+        транзакций, зафиксированных позже, не пропускаются. Для каждой
+        строки подсчитывается количество выгруженных строк с меньшим
+        ключом сортировки по индексу (export_id, collection_seconds,
+        project_id).
+
+        Args:
+            export_id: ID состояния отчета
+
+        Returns:
+            Select: Запрос строк отчета с колонкой exported_before
+                    в порядке времени сбора
+        """
+        exported = select(ReportExportRow.id).where(
+            ReportExportRow.export_id == export_id,
+            ReportExportRow.project_id == CharityProject.id
+        )
+        exported_before = select(func.count(ReportExportRow.id)).where(
+            ReportExportRow.export_id == export_id,
+            ReportExportRow.collection_seconds <=
+            CharityProject.collection_seconds,
+            or_(
+                ReportExportRow.collection_seconds <
+                CharityProject.collection_seconds,
+                ReportExportRow.project_id < CharityProject.id
+            )
+        ).scalar_subquery()
+        return select(
+            *charity_project_crud.report_columns,
+            exported_before.label('exported_before')
+        ).where(
+            CharityProject.collection_seconds.is_not(None),
+            ~exists(exported)
+        ).order_by(CharityProject.collection_seconds, CharityProject.id)
+
+    async def get_unexported_rows(
+        self, export_id: int, session: AsyncSession
+    ) -> List[Row]:
+        """Получает строки закрытых проектов, которых еще нет в отчете.
+
+        Args:
+            export_id: ID состояния отчета
+            session: Асинхронная сессия базы данных
+
+        Returns:
+            List[Row]: Строки отчета в порядке времени сбора
+        """
+        rows = await session.execute(self.get_unexported_query(export_id))
+        return rows.all()
+
+
+report_export_crud = CRUDReportExport(ReportExport)
@@ -1,13 +1,16 @@
 from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.api.routers import main_router
 from app.core.config import settings
 from app.core.init_db import create_first_superuser
+from app.core.metrics import collect_request_metrics
 
 
 app = FastAPI(title=settings.app_title, description=settings.app_description)
 
 app.include_router(main_router)
+app.add_middleware(BaseHTTPMiddleware, dispatch=collect_request_metrics)
 
 
 @app.on_event('startup')
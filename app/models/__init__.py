@@ -8,6 +8,9 @@
 
 from .charity_project import CharityProject # noqa
 from .donation import Donation # noqa
+from .report_export import ReportExport, ReportExportRow # noqa
 from .user import User # noqa
 
-__all__ = ['User', 'CharityProject', 'Donation']
\ No newline at end of file
+__all__ = [
+    'User', 'CharityProject', 'Donation', 'ReportExport', 'ReportExportRow'
+]
\ No newline at end of file
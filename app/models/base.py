@@ -1,13 +1,18 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, DateTime, Integer, Boolean
+from sqlalchemy import Column, DateTime, Index, Integer, Boolean, text
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 from app.service.constants import DEFAULT_INVESTED_AMOUNT
 
 
 def get_utc_now() -> datetime:
-    """Возвращает текущее время в UTC с учетом временной зоны."""
-    return datetime.now(timezone.utc)
+    """Возвращает текущее время в UTC без временной зоны.
+
+    Колонки дат хранят время без временной зоны, поэтому значение
+    в памяти совпадает с прочитанным из базы данных.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class CustomBaseModel(Base):
@@ -18,6 +23,27 @@ class CustomBaseModel(Base):
 
     __abstract__ = True
 
+    @declared_attr
+    def __table_args__(cls) -> tuple:
+        """Индексы, общие для проектов и пожертвований, и индексы модели.
+
+        Составной индекс по (fully_invested, create_date) обслуживает
+        выборку открытых объектов в порядке создания при инвестировании.
+        В PostgreSQL индекс частичный и содержит только открытые записи.
+        Собственные индексы модели перечисляются в __indexes__.
+        """
+        return (
+            Index(
+                f'ix_{cls.__tablename__}_fully_invested_create_date',
+                'fully_invested',
+                'create_date',
+                postgresql_where=text('fully_invested IS false'),
+            ),
+            *cls.__indexes__,
+        )
+
+    __indexes__: tuple = ()
+
     full_amount: int = Column(
         Integer,
         nullable=False,
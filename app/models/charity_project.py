@@ -1,4 +1,7 @@
-from sqlalchemy import Column, String
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Column, Float, Index, String, event
 
 from app.models.base import CustomBaseModel
 from app.service.constants import MAX_PROJECT_NAME_LENGTH
@@ -13,6 +16,14 @@ class CharityProject(CustomBaseModel):
     который нуждается в финансировании.
     """
 
+    __indexes__ = (
+        Index(
+            'ix_charityproject_collection_seconds_id',
+            'collection_seconds',
+            'id',
+        ),
+    )
+
     name: str = Column(
         String(MAX_PROJECT_NAME_LENGTH),
         unique=True,
@@ -24,3 +35,34 @@ class CharityProject(CustomBaseModel):
         nullable=False,
         comment='Подробное описание проекта и его целей'
     )
+    collection_seconds: float = Column(
+        Float,
+        comment='Время сбора средств в секундах, заполняется при закрытии'
+    )
+
+
+def get_collection_seconds(
+    create_date: Optional[datetime], close_date: datetime
+) -> float:
+    """Вычисляет время сбора средств проекта в секундах.
+
+    Даты без часового пояса считаются датами в UTC. Проект без даты
+    создания еще не сохранен и закрывается в момент создания.
+    """
+    if create_date is None:
+        return 0.0
+    if create_date.tzinfo is None:
+        create_date = create_date.replace(tzinfo=timezone.utc)
+    if close_date.tzinfo is None:
+        close_date = close_date.replace(tzinfo=timezone.utc)
+    return (close_date - create_date).total_seconds()
+
+
+@event.listens_for(CharityProject, 'before_insert')
+@event.listens_for(CharityProject, 'before_update')
+def set_collection_seconds(mapper, connection, project) -> None:
+    """Заполняет время сбора для проектов, закрытых через ORM."""
+    if project.close_date is not None and project.collection_seconds is None:
+        project.collection_seconds = get_collection_seconds(
+            project.create_date, project.close_date
+        )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.models.base import CustomBaseModel
@@ -13,6 +13,15 @@ class Donation(CustomBaseModel):
     Связана с моделью User через внешний ключ user_id.
     """
 
+    __indexes__ = (
+        Index(
+            'ix_donation_user_id_create_date_id',
+            'user_id',
+            'create_date',
+            'id',
+        ),
+    )
+
     user_id: int = Column(
         Integer,
         ForeignKey('user.id'),
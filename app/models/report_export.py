@@ -0,0 +1,78 @@
+from sqlalchemy import (
+    Column, Float, ForeignKey, Index, Integer, String, UniqueConstraint
+)
+
+from app.core.db import Base
+
+
+class ReportExport(Base):
+    """Состояние отчета, выгруженного в лист Google Таблицы.
+
+    Хранится в базе данных, чтобы инкрементальную выгрузку мог
+    продолжить любой процесс приложения. rows_count - количество
+    строк проектов, записанных на лист.
+    """
+
+    __table_args__ = (
+        UniqueConstraint(
+            'spreadsheet_id', 'sheet_id',
+            name='uq_reportexport_spreadsheet_id_sheet_id'
+        ),
+    )
+
+    spreadsheet_id: str = Column(
+        String,
+        nullable=False,
+        comment='ID таблицы, в которую выгружен отчет'
+    )
+    sheet_id: int = Column(
+        Integer,
+        nullable=False,
+        comment='ID листа таблицы'
+    )
+    rows_count: int = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment='Количество строк проектов на листе'
+    )
+
+
+class ReportExportRow(Base):
+    """Проект, выгруженный в отчет.
+
+    Ключ сортировки строки (collection_seconds, project_id) хранится
+    вместе с ней, чтобы позиция новой строки на листе считалась по
+    индексу без обращения к таблице проектов.
+    """
+
+    __table_args__ = (
+        UniqueConstraint(
+            'export_id', 'project_id',
+            name='uq_reportexportrow_export_id_project_id'
+        ),
+        Index(
+            'ix_reportexportrow_export_id_collection_seconds',
+            'export_id',
+            'collection_seconds',
+            'project_id',
+        ),
+    )
+
+    export_id: int = Column(
+        Integer,
+        ForeignKey('reportexport.id', ondelete='CASCADE'),
+        nullable=False,
+        comment='ID выгруженного отчета'
+    )
+    project_id: int = Column(
+        Integer,
+        ForeignKey('charityproject.id'),
+        nullable=False,
+        comment='ID выгруженного проекта'
+    )
+    collection_seconds: float = Column(
+        Float,
+        nullable=False,
+        comment='Время сбора средств проекта в секундах'
+    )
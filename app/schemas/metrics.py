@@ -0,0 +1,33 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class PoolMetricsDB(BaseModel):
+    """Возвращает состояние пула соединений с базой данных."""
+
+    pool_class: str = Field(..., description='Класс пула соединений')
+    size: Optional[int] = Field(
+        None,
+        description='Размер пула соединений'
+    )
+    overflow: Optional[int] = Field(
+        None,
+        description='Количество соединений сверх размера пула'
+    )
+    checked_out: int = Field(
+        ...,
+        description='Количество выданных из пула соединений'
+    )
+    checkouts: int = Field(
+        ...,
+        description='Общее количество выдач соединений из пула'
+    )
+    wait_seconds_total: float = Field(
+        ...,
+        description='Суммарное время ожидания соединения в секундах'
+    )
+    wait_seconds_max: float = Field(
+        ...,
+        description='Максимальное время ожидания соединения в секундах'
+    )
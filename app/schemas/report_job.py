@@ -0,0 +1,52 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ReportJobStatus(str, Enum):
+    """Состояния задачи формирования отчета."""
+
+    pending = 'pending'
+    running = 'running'
+    done = 'done'
+    failed = 'failed'
+
+
+class ReportJobDB(BaseModel):
+    """Возвращает состояние задачи формирования отчета."""
+
+    id: str = Field(..., description='Идентификатор задачи')
+    status: ReportJobStatus = Field(
+        ReportJobStatus.pending,
+        description='Состояние задачи'
+    )
+    incremental: bool = Field(
+        False,
+        description='Добавить в отчет только новые закрытые проекты'
+    )
+    create_date: datetime = Field(
+        ...,
+        description='Дата и время постановки задачи в очередь'
+    )
+    close_date: Optional[datetime] = Field(
+        None,
+        description='Дата и время завершения задачи'
+    )
+    spreadsheet_url: Optional[str] = Field(
+        None,
+        description='Ссылка на обновленную таблицу'
+    )
+    progress: Optional[int] = Field(
+        None,
+        description='Количество строк, уже записанных в таблицу'
+    )
+    projects_count: Optional[int] = Field(
+        None,
+        description='Количество проектов в отчете'
+    )
+    error: Optional[str] = Field(
+        None,
+        description='Описание ошибки, если задача завершилась неудачно'
+    )
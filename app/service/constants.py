@@ -13,6 +13,19 @@ MIN_INVESTED_AMOUNT: Минимально допустимая сумма инв
 DEFAULT_INVESTED_AMOUNT: Значение инвестированной суммы по умолчанию при
                         создании проекта.
 
+MAX_BATCH_SIZE: Максимальное количество объектов в одном пакетном запросе
+                на создание.
+
+IN_QUERY_CHUNK_SIZE: Максимальное количество значений в одном условии
+                     IN (SQLite до версии 3.32 принимает не более 999
+                     параметров в запросе).
+
+MAX_PAGE_SIZE: Максимальный размер страницы при постраничной выдаче
+               списков.
+
+STREAM_BATCH_SIZE: Количество строк, читаемых из базы за один раз при
+                   потоковой выдаче списков.
+
 MAX_PROJECT_NAME_LENGTH: Максимальная допустимая длина названия
                         благотворительного проекта.
 
@@ -26,10 +39,24 @@ SPREADSHEET_HEADERS: Заголовки колонок для отчета в Go
 
 SPREADSHEET_COLUMN_COUNT: Количество колонок в отчете Google Таблиц.
 
-SPREADSHEET_HEADER_RANGE: Диапазон ячеек для заголовков отчета.
-
 SPREADSHEET_HEADER_BACKGROUND: Цвет фона для заголовков отчета.
 
+SPREADSHEET_URL: Шаблон ссылки на Google Таблицу по ее ID.
+
+SPREADSHEET_BATCH_UPDATE_URL: Шаблон адреса метода
+                              spreadsheets.batchUpdate Google Sheets API.
+
+SPREADSHEET_VALUES_BY_FILTER_URL: Шаблон адреса метода
+                                  spreadsheets.values.batchGetByDataFilter
+                                  Google Sheets API.
+
+GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS: За сколько секунд до истечения
+                                     токена доступа Google он
+                                     обновляется заранее.
+
+REPORT_JOBS_HISTORY_SIZE: Количество завершенных задач формирования
+                          отчета, доступных для просмотра статуса.
+
 SECONDS_IN_HOUR: Количество секунд в одном часе.
 
 SECONDS_IN_MINUTE: Количество секунд в одной минуте.
@@ -45,6 +72,10 @@ MIN_PROJECT_NAME_LENGTH = 1
 MIN_DESCRIPTION_LENGTH = 1
 MIN_INVESTED_AMOUNT = 0
 DEFAULT_INVESTED_AMOUNT = 0
+MAX_BATCH_SIZE = 1000
+IN_QUERY_CHUNK_SIZE = 500
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
 
 # Google Sheets
 SPREADSHEET_HEADERS = [
@@ -55,13 +86,22 @@ SPREADSHEET_HEADERS = [
     'Дата закрытия'
 ]
 SPREADSHEET_COLUMN_COUNT = 4
-SPREADSHEET_HEADER_RANGE = 'A1:E1'
 SPREADSHEET_HEADER_BACKGROUND = {
     'red': 0.9,
     'green': 0.9,
     'blue': 0.9
 }
 BASE_SCOPE = 'https://www.googleapis.com/auth/'
+SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/{}'
+SPREADSHEET_BATCH_UPDATE_URL = (
+    'https://sheets.googleapis.com/v4/spreadsheets/{}:batchUpdate'
+)
+SPREADSHEET_VALUES_BY_FILTER_URL = (
+    'https://sheets.googleapis.com/v4/spreadsheets/{}'
+    '/values:batchGetByDataFilter'
+)
+GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS = 300
+REPORT_JOBS_HISTORY_SIZE = 100
 
 # Форматирование времени
 SECONDS_IN_HOUR = 3600
@@ -1,29 +1,69 @@
-from datetime import datetime, timezone
-from typing import Union, List
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from http import HTTPStatus
+from typing import (
+    Any, AsyncIterator, Deque, Iterable, Optional, Tuple, Union, List
+)
+from weakref import WeakKeyDictionary
 
-from app.models import CharityProject, Donation
+from fastapi import HTTPException
+from sqlalchemy import Table, and_, case, func, literal, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
 
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.models import CharityProject, Donation, User
+from app.models.base import get_utc_now
+from app.models.charity_project import get_collection_seconds
+from app.service.exceptions import OpenPoolMismatchError
+from app.service.open_pool import open_pool_cache
 
-def invest_funds(
+logger = logging.getLogger(__name__)
+
+CONFLICT_SQLSTATES = ('40001', '40P01')
+SQLITE_LOCKED_MESSAGE = 'database is locked'
+
+_sqlite_writer_locks = WeakKeyDictionary()
+
+
+def _close(
+    obj: Union[CharityProject, Donation],
+    current_time: datetime
+) -> None:
+    """Закрывает объект, набравший полную сумму.
+
+    Для проекта сразу запоминается время сбора средств.
+    """
+    obj.fully_invested = True
+    obj.close_date = current_time
+    if isinstance(obj, CharityProject):
+        obj.collection_seconds = get_collection_seconds(
+            obj.create_date, current_time
+        )
+
+
+def _transfer_funds(
     target: Union[CharityProject, Donation],
-    sources: List[Union[CharityProject, Donation]]
+    sources: List[Union[CharityProject, Donation]],
+    current_time: datetime
 ) -> List[Union[CharityProject, Donation]]:
-    """Распределяет средства между проектами и пожертвованиями.
-
-    Для нового проекта ищет незакрытые пожертвования
-    и распределяет их средства.
-    Для нового пожертвования ищет незакрытые проекты
-    и распределяет средства в них.
+    """Переносит средства из источников в цель, пока цель не закрыта.
 
     Args:
-        target: Новый объект (проект или пожертвование) для инвестирования
-        sources: Список незавершенных объектов для распределения средств
+        target: Объект, в который распределяются средства
+        sources: Незавершенные объекты в порядке создания
+        current_time: Время закрытия для объектов, набравших сумму
 
     Returns:
-        List[Union[CharityProject, Donation]]: Список измененных объектов
+        List[Union[CharityProject, Donation]]: Измененные источники
     """
-    current_time = datetime.now(timezone.utc)
-    modified_objects = []
+    modified_sources = []
     for source in sources:
         if target.fully_invested:
             break
@@ -35,11 +75,468 @@ def invest_funds(
         target.invested_amount = target_invested + amount
         source.invested_amount = source_invested + amount
         if source.invested_amount == source.full_amount:
-            source.fully_invested = True
-            source.close_date = current_time
+            _close(source, current_time)
         if target.invested_amount == target.full_amount:
-            target.fully_invested = True
-            target.close_date = current_time
-        modified_objects.append(source)
+            _close(target, current_time)
+        modified_sources.append(source)
+    return modified_sources
+
+
+def invest_funds(
+    target: Union[CharityProject, Donation],
+    sources: List[Union[CharityProject, Donation]]
+) -> List[Union[CharityProject, Donation]]:
+    """Распределяет средства между проектами и пожертвованиями.
+
+    Для нового проекта ищет незакрытые пожертвования
+    и распределяет их средства.
+    Для нового пожертвования ищет незакрытые проекты
+    и распределяет средства в них.
+
+    Args:
+        target: Новый объект (проект или пожертвование) для инвестирования
+        sources: Список незавершенных объектов для распределения средств
+
+    Returns:
+        List[Union[CharityProject, Donation]]: Список измененных объектов
+    """
+    current_time = get_utc_now()
+    modified_objects = _transfer_funds(target, sources, current_time)
     modified_objects.append(target)
     return modified_objects
+
+
+async def _lock_open_prefix(
+    table: Table,
+    remaining: ColumnElement,
+    is_open: ColumnElement,
+    required: int,
+    session: AsyncSession
+) -> Tuple[int, Optional[Row]]:
+    """Блокирует старейшие незакрытые источники на требуемую сумму.
+
+    Источники читаются курсором в порядке создания пачками по
+    settings.invest_batch_size и блокируются (FOR UPDATE) по мере
+    чтения, пока сумма их остатков не покроет required.
+
+    Args:
+        table: Таблица источников
+        remaining: Выражение нераспределенного остатка источника
+        is_open: Условие незакрытого источника
+        required: Требуемая сумма
+        session: Асинхронная сессия базы данных
+
+    Returns:
+        Tuple[int, Optional[Row]]: Сумма остатков заблокированных
+        источников и строка (id, create_date) последнего из них
+        (None, если незакрытых источников нет)
+    """
+    result = await session.stream(
+        select(
+            table.c.id, table.c.create_date, remaining.label('remaining')
+        ).where(is_open).order_by(
+            table.c.create_date, table.c.id
+        ).with_for_update().execution_options(
+            yield_per=settings.invest_batch_size
+        )
+    )
+    available = 0
+    last = None
+    try:
+        async for row in result:
+            available += row.remaining
+            last = row
+            if available >= required:
+                break
+    finally:
+        await result.close()
+    return available, last
+
+
+async def _invest_in_database(
+    target: Union[CharityProject, Donation],
+    source_crud: CRUDBase,
+    session: AsyncSession,
+    current_time: datetime
+) -> None:
+    """Распределяет средства цели внутри базы данных.
+
+    Нарастающий итог остатков незакрытых источников в порядке создания
+    считается оконной функцией, и все источники, попадающие в
+    требуемую сумму, обновляются одним UPDATE. Результат совпадает с
+    перебором в _transfer_funds. Оконные функции несовместимы с
+    FOR UPDATE, поэтому источники блокируются заранее отдельным
+    запросом (_lock_open_prefix), и только те из них, остатков которых
+    хватает на требуемую сумму. Параллельные транзакции ждут друг
+    друга только на общих старых источниках.
+
+    Args:
+        target: Новый объект (проект или пожертвование) для инвестирования
+        source_crud: CRUD модели, из незакрытых объектов которой
+                     распределяются средства
+        session: Асинхронная сессия базы данных
+        current_time: Время закрытия для объектов, набравших сумму
+    """
+    table = source_crud.model.__table__
+    target_invested = target.invested_amount or 0
+    required = target.full_amount - target_invested
+    remaining = table.c.full_amount - func.coalesce(table.c.invested_amount, 0)
+    is_open = table.c.fully_invested.is_(False)
+    available, last = await _lock_open_prefix(
+        table, remaining, is_open, required, session
+    )
+    if last is None:
+        return
+    in_prefix = or_(
+        table.c.create_date < last.create_date,
+        and_(
+            table.c.create_date == last.create_date,
+            table.c.id <= last.id
+        )
+    )
+    ranked = select(
+        table.c.id,
+        remaining.label('remaining'),
+        func.sum(remaining).over(
+            order_by=(table.c.create_date, table.c.id)
+        ).label('running_total'),
+    ).where(is_open, in_prefix).subquery('ranked')
+    invested_before = ranked.c.running_total - ranked.c.remaining
+    allocation = select(
+        ranked.c.id,
+        case(
+            (ranked.c.running_total <= required, ranked.c.remaining),
+            else_=required - invested_before,
+        ).label('amount'),
+    ).where(invested_before < required).cte('allocation')
+    amount = select(allocation.c.amount).where(
+        allocation.c.id == table.c.id
+    ).scalar_subquery()
+    close_date = case(
+        (amount == remaining, literal(current_time, table.c.close_date.type)),
+        else_=table.c.close_date,
+    )
+    await session.execute(
+        update(table).where(
+            table.c.id.in_(select(allocation.c.id))
+        ).values(
+            invested_amount=func.coalesce(table.c.invested_amount, 0) + amount,
+            fully_invested=amount == remaining,
+            close_date=close_date,
+            **source_crud.get_closing_values(close_date),
+        )
+    )
+    target.invested_amount = target_invested + min(required, available)
+    if target.invested_amount == target.full_amount:
+        _close(target, current_time)
+
+
+def _fill_targets(
+    open_targets: Deque[Union[CharityProject, Donation]],
+    sources: Iterable,
+    current_time: datetime
+) -> list:
+    """Заполняет цели по очереди из общего набора источников.
+
+    Частично израсходованный источник переходит к следующей цели,
+    закрытые цели удаляются из начала очереди.
+
+    Args:
+        open_targets: Очередь незакрытых целей в порядке создания
+        sources: Незакрытые источники в порядке создания
+        current_time: Время закрытия для объектов, набравших сумму
+
+    Returns:
+        list: Источники, из которых распределялись средства
+    """
+    modified_sources = []
+    for source in sources:
+        if not open_targets:
+            break
+        while open_targets and not source.fully_invested:
+            _transfer_funds(open_targets[0], [source], current_time)
+            if open_targets[0].fully_invested:
+                open_targets.popleft()
+        modified_sources.append(source)
+    return modified_sources
+
+
+async def _invest_from_cache(
+    targets: List[Union[CharityProject, Donation]],
+    source_crud: CRUDBase,
+    session: AsyncSession,
+    current_time: datetime
+) -> None:
+    """Распределяет средства по закэшированному пулу источников.
+
+    Список открытых источников из базы не читается: суммы добавляются
+    к источникам условным UPDATE, который срабатывает только при
+    совпадении остатка в базе с закэшированным. Изменения пулов
+    применяются к кэшу после коммита.
+
+    Args:
+        targets: Новые объекты одного типа в порядке создания
+        source_crud: CRUD модели, из незакрытых объектов которой
+                     распределяются средства
+        session: Асинхронная сессия базы данных
+        current_time: Время закрытия для объектов, набравших сумму
+
+    Raises:
+        OpenPoolMismatchError: Если кэш разошелся с базой данных
+    """
+    pool = await open_pool_cache.get(source_crud, session)
+    open_targets = deque(
+        target for target in targets if not target.fully_invested
+    )
+    slots = _fill_targets(open_targets, pool.slots(), current_time)
+    matched = await source_crud.apply_investment_deltas([
+        {
+            'obj_id': slot.id,
+            'expected': slot.full_amount,
+            'amount': slot.invested_amount,
+            'closed': slot.fully_invested,
+            'close_date': slot.close_date,
+        }
+        for slot in slots
+    ], session)
+    if not matched:
+        raise OpenPoolMismatchError(
+            f'Кэш незакрытых объектов {source_crud.model.__name__} '
+            'разошелся с базой данных'
+        )
+    await session.flush()
+    open_pool_cache.add_pending(
+        session, source_crud.model, slots, type(targets[0]), targets
+    )
+
+
+async def invest_batch_from_open_pool(
+    targets: List[Union[CharityProject, Donation]],
+    source_crud: CRUDBase,
+    session: AsyncSession
+) -> List[Union[CharityProject, Donation]]:
+    """Распределяет средства по нескольким целям за один проход.
+
+    Цели заполняются по очереди из одного потока незакрытых источников:
+    частично израсходованный источник переходит к следующей цели.
+    Источники выбираются курсором пачками по settings.invest_batch_size
+    и перебираются только до закрытия последней цели, поэтому небольшое
+    пожертвование не загружает весь список открытых проектов.
+    Изменения источников записываются одним пакетным UPDATE, а новые
+    цели остаются в сессии и сохраняются INSERT при коммите.
+
+    При settings.invest_engine == 'sql' распределение целиком
+    выполняется в базе данных (_invest_in_database), а при включенном
+    settings.open_pool_cache - по закэшированному пулу
+    (_invest_from_cache). В обоих случаях источники в сессию
+    не загружаются и в результат попадают только цели.
+
+    Еще не сохраненным целям датой создания назначается время
+    распределения, чтобы цель, закрытая сразу при создании, не
+    получила дату закрытия раньше даты создания.
+
+    Args:
+        targets: Новые объекты одного типа в порядке создания
+        source_crud: CRUD модели, из незакрытых объектов которой
+                     распределяются средства
+        session: Асинхронная сессия базы данных
+
+    Returns:
+        List[Union[CharityProject, Donation]]: Список измененных объектов
+    """
+    current_time = get_utc_now()
+    for target in targets:
+        if target.create_date is None:
+            target.create_date = current_time
+    if settings.invest_engine == 'sql':
+        with session.no_autoflush:
+            for target in targets:
+                await _invest_in_database(
+                    target, source_crud, session, current_time
+                )
+        return list(targets)
+    if settings.open_pool_cache:
+        with session.no_autoflush:
+            await _invest_from_cache(
+                targets, source_crud, session, current_time
+            )
+        return list(targets)
+    open_targets = deque(
+        target for target in targets if not target.fully_invested
+    )
+    modified_objects = []
+    with session.no_autoflush:
+        sources = await source_crud.stream_open_objects(
+            session, settings.invest_batch_size
+        )
+        try:
+            async for batch in sources.partitions():
+                modified_objects.extend(
+                    _fill_targets(open_targets, batch, current_time)
+                )
+                if not open_targets:
+                    break
+        finally:
+            await sources.close()
+        await source_crud.bulk_update_investment(modified_objects, session)
+    modified_objects.extend(targets)
+    return modified_objects
+
+
+async def invest_from_open_pool(
+    target: Union[CharityProject, Donation],
+    source_crud: CRUDBase,
+    session: AsyncSession
+) -> List[Union[CharityProject, Donation]]:
+    """Распределяет средства, читая незакрытые объекты потоком.
+
+    Args:
+        target: Новый объект (проект или пожертвование) для инвестирования
+        source_crud: CRUD модели, из незакрытых объектов которой
+                     распределяются средства
+        session: Асинхронная сессия базы данных
+
+    Returns:
+        List[Union[CharityProject, Donation]]: Список измененных объектов
+    """
+    return await invest_batch_from_open_pool([target], source_crud, session)
+
+
+def _is_conflict(error: DBAPIError) -> bool:
+    """Проверяет, вызвана ли ошибка конфликтом параллельных транзакций.
+
+    Args:
+        error: Ошибка драйвера базы данных
+
+    Returns:
+        bool: True для ошибок сериализации, взаимоблокировок и
+              занятой базы SQLite
+    """
+    if getattr(error.orig, 'sqlstate', None) in CONFLICT_SQLSTATES:
+        return True
+    return SQLITE_LOCKED_MESSAGE in str(error.orig)
+
+
+@asynccontextmanager
+async def serialized_writer(session: AsyncSession) -> AsyncIterator[None]:
+    """Последовательно пропускает инвестирование для SQLite.
+
+    SQLite не умеет блокировать отдельные строки, поэтому в пределах
+    процесса инвестирование выполняется под общей блокировкой
+    (отдельной для каждого event loop). Та же блокировка защищает
+    кэш незакрытых объектов, если он включен: под ней выполняются и
+    изменения проектов, сбрасывающие кэш. В остальных случаях
+    достаточно блокировок строк и контекст ничего не делает.
+
+    Args:
+        session: Асинхронная сессия базы данных
+    """
+    dialect_name = session.sync_session.get_bind().dialect.name
+    if dialect_name != 'sqlite' and not settings.open_pool_cache:
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    lock = _sqlite_writer_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        yield
+
+
+async def create_batch_with_investment(
+    objs_in: List[Any],
+    target_crud: CRUDBase,
+    source_crud: CRUDBase,
+    session: AsyncSession,
+    user: Optional[User] = None
+) -> List[Union[CharityProject, Donation]]:
+    """Создает объекты, распределяет средства и фиксирует транзакцию.
+
+    Объекты создаются в порядке следования objs_in и заполняются из
+    одного набора незакрытых источников, после чего выполняется один
+    коммит. Создание, распределение и коммит выполняются под
+    блокировками (строк в PostgreSQL, общей блокировкой записи в
+    SQLite). При конфликте параллельных транзакций или расхождении
+    кэша незакрытых объектов с базой попытка откатывается и
+    повторяется не более settings.invest_max_retries раз; сброшенный
+    кэш при повторе читается из базы. Если конфликт сохраняется во
+    всех попытках, запрос завершается ошибкой 409.
+
+    Args:
+        objs_in: Данные для создания объектов
+        target_crud: CRUD модели создаваемых объектов
+        source_crud: CRUD модели, из незакрытых объектов которой
+                     распределяются средства
+        session: Асинхронная сессия базы данных
+        user: Пользователь, создающий объекты (опционально)
+
+    Returns:
+        List[Union[CharityProject, Donation]]: Созданные объекты
+
+    Raises:
+        DBAPIError: Если ошибка не связана с конфликтом
+        HTTPException: Если конфликт или расхождение кэша с базой
+                       сохраняются во всех попытках
+    """
+    for attempt in range(1, settings.invest_max_retries + 1):
+        try:
+            async with serialized_writer(session):
+                targets = [
+                    await target_crud.create(
+                        obj_in, session, user, commit=False
+                    )
+                    for obj_in in objs_in
+                ]
+                await invest_batch_from_open_pool(
+                    targets, source_crud, session
+                )
+                await session.commit()
+                open_pool_cache.apply_pending(session)
+            return targets
+        except (DBAPIError, OpenPoolMismatchError) as error:
+            await session.rollback()
+            open_pool_cache.discard_pending(session)
+            if isinstance(error, OpenPoolMismatchError):
+                open_pool_cache.invalidate(source_crud.model)
+            if not (
+                isinstance(error, OpenPoolMismatchError) or
+                _is_conflict(error)
+            ):
+                raise
+            if attempt == settings.invest_max_retries:
+                raise HTTPException(
+                    status_code=HTTPStatus.CONFLICT,
+                    detail=(
+                        'Не удалось распределить средства из-за '
+                        'параллельных операций, повторите запрос'
+                    )
+                ) from error
+            logger.warning(
+                f'Конфликт при инвестировании, попытка {attempt}: {error}'
+            )
+            if user is not None and user in session:
+                await session.refresh(user)
+
+
+async def create_with_investment(
+    obj_in: Any,
+    target_crud: CRUDBase,
+    source_crud: CRUDBase,
+    session: AsyncSession,
+    user: Optional[User] = None
+) -> Union[CharityProject, Donation]:
+    """Создает объект, распределяет средства и фиксирует транзакцию.
+
+    Args:
+        obj_in: Данные для создания объекта
+        target_crud: CRUD модели создаваемого объекта
+        source_crud: CRUD модели, из незакрытых объектов которой
+                     распределяются средства
+        session: Асинхронная сессия базы данных
+        user: Пользователь, создающий объект (опционально)
+
+    Returns:
+        Union[CharityProject, Donation]: Созданный объект
+    """
+    targets = await create_batch_with_investment(
+        [obj_in], target_crud, source_crud, session, user
+    )
+    return targets[0]
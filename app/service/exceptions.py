@@ -1,2 +1,6 @@
 class GoogleSheetsServiceError(Exception):
     """Исключение для ошибок сервиса Google Sheets."""
+
+
+class OpenPoolMismatchError(Exception):
+    """Исключение при расхождении кэша незакрытых объектов с базой."""
@@ -1,80 +1,161 @@
 from http import HTTPStatus
 
-import gspread
 import logging
-from google.oauth2.service_account import Credentials
 from fastapi import HTTPException
-from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Optional
 
 from app.core.config import settings
+from app.core.google_client import GoogleClientProvider, google_client_provider
 from app.schemas.charity_project import CharityProjectReport
 from app.service.constants import (
-    BASE_SCOPE,
+    SPREADSHEET_BATCH_UPDATE_URL,
     SPREADSHEET_HEADERS,
+    SPREADSHEET_URL,
     SPREADSHEET_COLUMN_COUNT,
-    SPREADSHEET_HEADER_RANGE,
-    SPREADSHEET_HEADER_BACKGROUND
+    SPREADSHEET_HEADER_BACKGROUND,
+    SPREADSHEET_VALUES_BY_FILTER_URL
 )
+from app.service.exceptions import GoogleSheetsServiceError
 
 logger = logging.getLogger(__name__)
 
 
 class GoogleAPIService:
-    """Сервис для работы с Google Sheets API."""
+    """Сервис для работы с Google Sheets API.
 
-    def __init__(self):
-        try:
-            self.credentials = self._get_credentials()
-            self.client = gspread.authorize(self.credentials)
-            logger.info('Google API client инициализирован успешно')
-        except Exception as e:
-            logger.error(f'Ошибка инициализации Google API: {str(e)}')
-            raise
-
-    def _get_credentials(self) -> Credentials:
-        """Получает учетные данные для доступа к Google API."""
-        try:
-            logger.info('Получение credentials...')
-            required_fields = ['type', 'project_id', 'private_key_id',
-                               'private_key', 'client_email']
-            for field in required_fields:
-                if not getattr(settings, field, None):
-                    raise ValueError(f'Отсутствует обязательное поле: {field}')
-            creds_dict = {
-                'type': settings.type,
-                'project_id': settings.project_id,
-                'private_key_id': settings.private_key_id,
-                'private_key': settings.private_key.replace('\\n', '\n'),
-                'client_email': settings.client_email,
-                'client_id': settings.client_id,
-                'auth_uri': settings.auth_uri,
-                'token_uri': settings.token_uri,
-                'auth_provider_x509_cert_url': (
-                    settings.auth_provider_x509_cert_url
-                ),
-                'client_x509_cert_url': settings.client_x509_cert_url,
-            }
-            logger.info('Credentials созданы, аутентификация...')
-            SCOPES = [
-                f'{BASE_SCOPE}spreadsheets',
-                f'{BASE_SCOPE}drive.file'
-            ]
-            creds = Credentials.from_service_account_info(creds_dict)
-            creds = creds.with_scopes(SCOPES)
-            return creds
-        except Exception as error:
-            logger.error(f'Ошибка аутентификации: {str(error)}')
-            raise HTTPException(
-                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
-                detail=f'Ошибка аутентификации в Google API: {str(error)}'
+    Клиент Google запрашивается у провайдера при каждом обращении к
+    API: он создается при первом отчете и затем переиспользуется.
+    """
+
+    def __init__(self, provider: GoogleClientProvider):
+        self.provider = provider
+
+    @staticmethod
+    def _build_cell(value: Any, cell_format: Optional[dict] = None) -> dict:
+        """Формирует ячейку для запроса batchUpdate."""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cell = {'userEnteredValue': {'numberValue': value}}
+        else:
+            cell = {'userEnteredValue': {'stringValue': str(value)}}
+        if cell_format:
+            cell['userEnteredFormat'] = cell_format
+        return cell
+
+    def _build_row(self, project: CharityProjectReport) -> dict:
+        """Формирует строку листа по строке отчета."""
+        return {'values': [
+            self._build_cell(value) for value in (
+                project.name,
+                project.collection_time,
+                project.description,
+                project.collected_amount,
+                project.close_date
             )
+        ]}
 
-    def update_spreadsheet(
+    @staticmethod
+    def _build_resize_request(sheet_id: int) -> dict:
+        """Формирует запрос подбора ширины колонок отчета."""
+        return {'autoResizeDimensions': {'dimensions': {
+            'sheetId': sheet_id,
+            'dimension': 'COLUMNS',
+            'startIndex': 0,
+            'endIndex': SPREADSHEET_COLUMN_COUNT
+        }}}
+
+    def _build_report_requests(
         self,
         projects: list[CharityProjectReport],
+        sheet_id: int,
+        clear: bool = True,
+        resize: bool = True
+    ) -> list[dict]:
+        """Формирует запросы batchUpdate для записи отчета.
+
+        При clear лист очищается и первой строкой добавляются заголовки
+        с форматированием. Строки проектов добавляются одним
+        appendCells, при resize после них подбирается ширина колонок.
+        """
+        requests = []
+        rows = []
+        if clear:
+            requests.append({'updateCells': {
+                'range': {'sheetId': sheet_id},
+                'fields': 'userEnteredValue,userEnteredFormat'
+            }})
+            header_format = {
+                'textFormat': {'bold': True},
+                'backgroundColor': SPREADSHEET_HEADER_BACKGROUND
+            }
+            rows.append({'values': [
+                self._build_cell(header, header_format)
+                for header in SPREADSHEET_HEADERS
+            ]})
+        rows.extend(self._build_row(project) for project in projects)
+        if rows:
+            requests.append({'appendCells': {
+                'sheetId': sheet_id,
+                'rows': rows,
+                'fields': 'userEnteredValue,userEnteredFormat'
+            }})
+        if resize:
+            requests.append(self._build_resize_request(sheet_id))
+        return requests
+
+    def _build_insert_requests(
+        self,
+        rows: list[tuple[int, CharityProjectReport]],
+        sheet_id: int
+    ) -> list[dict]:
+        """Формирует запросы batchUpdate для вставки строк отчета.
+
+        Каждая строка вставляется в свою позицию insertDimension и
+        заполняется updateCells. Строки должны идти по возрастанию
+        итоговых позиций: тогда вставка очередной строки не сдвигает
+        уже вставленные.
+        """
+        requests = []
+        for row_index, project in rows:
+            requests.append({'insertDimension': {
+                'range': {
+                    'sheetId': sheet_id,
+                    'dimension': 'ROWS',
+                    'startIndex': row_index,
+                    'endIndex': row_index + 1
+                },
+                'inheritFromBefore': False
+            }})
+            requests.append({'updateCells': {
+                'start': {
+                    'sheetId': sheet_id,
+                    'rowIndex': row_index,
+                    'columnIndex': 0
+                },
+                'rows': [self._build_row(project)],
+                'fields': 'userEnteredValue,userEnteredFormat'
+            }})
+        requests.append(self._build_resize_request(sheet_id))
+        return requests
+
+    def _post(
+        self,
+        url_template: str,
+        body: dict,
         spreadsheet_id: Optional[str] = None
-    ) -> str:
-        """Обновляет данные в существующей таблице."""
+    ) -> Any:
+        """Отправляет POST-запрос к методу таблицы Google Sheets API.
+
+        Args:
+            url_template: Шаблон адреса метода с местом для ID таблицы
+            body: Тело запроса
+            spreadsheet_id: ID таблицы (опционально)
+
+        Returns:
+            Ответ Google API
+        """
+        from gspread.exceptions import APIError
+
         try:
             target_spreadsheet_id = spreadsheet_id or settings.spreadsheet_id
             if not target_spreadsheet_id:
@@ -82,35 +163,25 @@ class GoogleAPIService:
                     status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                     detail='Не указан ID таблицы. Укажите SPREADSHEET_ID'
                 )
-            logger.info(f'Открываем таблицу с ID: {target_spreadsheet_id}')
-            spreadsheet = self.client.open_by_key(target_spreadsheet_id)
-            worksheet = spreadsheet.sheet1
-            worksheet.clear()
-            worksheet.update(SPREADSHEET_HEADER_RANGE, [SPREADSHEET_HEADERS])
-            data = []
-            for project in projects:
-                data.append([
-                    project.name,
-                    project.collection_time,
-                    project.description,
-                    project.collected_amount,
-                    project.close_date
-                ])
-            if data:
-                worksheet.update(f'A2:E{len(data) + 1}', data)
-            worksheet.format(SPREADSHEET_HEADER_RANGE, {
-                'textFormat': {'bold': True},
-                'backgroundColor': SPREADSHEET_HEADER_BACKGROUND
-            })
-            try:
-                worksheet.columns_auto_resize(0, SPREADSHEET_COLUMN_COUNT)
-            except Exception as e:
-                logger.warning(
-                    f'Не удалось автоматически изменить размер колонок: {e}'
+            logger.info(f'Обращаемся к таблице с ID: {target_spreadsheet_id}')
+            return self.provider.get_client().request(
+                'post',
+                url_template.format(target_spreadsheet_id),
+                json=body
+            )
+        except GoogleSheetsServiceError as error:
+            logger.error(f'Ошибка аутентификации: {str(error)}')
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail=f'Ошибка аутентификации в Google API: {str(error)}'
+            )
+        except APIError as error:
+            if error.response.status_code != HTTPStatus.NOT_FOUND:
+                logger.error(f'Ошибка обновления таблицы: {str(error)}')
+                raise HTTPException(
+                    status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                    detail=f'Ошибка обновления таблицы: {str(error)}'
                 )
-            logger.info(f'Таблица обновлена {len(data)} проектами')
-            return spreadsheet.url
-        except gspread.SpreadsheetNotFound:
             logger.error(f'Таблица с ID {target_spreadsheet_id} не найдена')
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
@@ -126,5 +197,153 @@ class GoogleAPIService:
                 detail=f'Ошибка обновления таблицы: {str(error)}'
             )
 
+    def _batch_update(
+        self,
+        requests: list[dict],
+        spreadsheet_id: Optional[str] = None
+    ) -> str:
+        """Отправляет запросы одним spreadsheets.batchUpdate.
+
+        Запросы применяются к таблице атомарно: при ошибке таблица
+        остается без изменений.
+
+        Returns:
+            str: Ссылка на таблицу
+        """
+        self._post(
+            SPREADSHEET_BATCH_UPDATE_URL,
+            {'requests': requests},
+            spreadsheet_id
+        )
+        return SPREADSHEET_URL.format(
+            spreadsheet_id or settings.spreadsheet_id
+        )
+
+    def get_sheet_rows_count(
+        self, spreadsheet_id: Optional[str] = None
+    ) -> int:
+        """Получает количество заполненных строк листа отчета.
+
+        Читается только первая колонка листа settings.spreadsheet_sheet_id:
+        Google API отбрасывает пустые строки в ее конце, поэтому длина
+        колонки равна числу строк отчета вместе с заголовком.
+
+        Args:
+            spreadsheet_id: ID таблицы (опционально)
+
+        Returns:
+            int: Количество строк на листе
+        """
+        response = self._post(
+            SPREADSHEET_VALUES_BY_FILTER_URL,
+            {
+                'dataFilters': [{'gridRange': {
+                    'sheetId': settings.spreadsheet_sheet_id,
+                    'startColumnIndex': 0,
+                    'endColumnIndex': 1
+                }}],
+                'majorDimension': 'COLUMNS'
+            },
+            spreadsheet_id
+        )
+        value_ranges = response.json().get('valueRanges', [])
+        if not value_ranges:
+            return 0
+        columns = value_ranges[0]['valueRange'].get('values', [])
+        return len(columns[0]) if columns else 0
+
+    def update_spreadsheet(
+        self,
+        projects: list[CharityProjectReport],
+        spreadsheet_id: Optional[str] = None,
+        clear: bool = True,
+        resize: bool = True
+    ) -> str:
+        """Обновляет данные в существующей таблице.
+
+        Очистка листа, запись заголовков и данных, форматирование
+        и подбор ширины колонок отправляются одним запросом
+        spreadsheets.batchUpdate в лист settings.spreadsheet_sheet_id.
+        Большой отчет записывается частями: первая часть с clear,
+        следующие дописываются в конец листа без clear, а ширина
+        колонок подбирается после последней части.
+
+        Args:
+            projects: Строки отчета
+            spreadsheet_id: ID таблицы (опционально)
+            clear: Очистить лист и записать заголовки
+            resize: Подобрать ширину колонок
+
+        Returns:
+            str: Ссылка на таблицу
+        """
+        spreadsheet_url = self._batch_update(
+            self._build_report_requests(
+                projects, settings.spreadsheet_sheet_id, clear, resize
+            ),
+            spreadsheet_id
+        )
+        logger.info(f'В таблицу записано {len(projects)} проектов')
+        return spreadsheet_url
+
+    def insert_report_rows(
+        self,
+        rows: list[tuple[int, CharityProjectReport]],
+        spreadsheet_id: Optional[str] = None
+    ) -> str:
+        """Вставляет строки в существующий отчет одним batchUpdate.
+
+        Args:
+            rows: Пары (индекс строки на листе, строка отчета)
+                  по возрастанию индекса
+            spreadsheet_id: ID таблицы (опционально)
+
+        Returns:
+            str: Ссылка на таблицу
+        """
+        spreadsheet_url = self._batch_update(
+            self._build_insert_requests(
+                rows, settings.spreadsheet_sheet_id
+            ),
+            spreadsheet_id
+        )
+        logger.info(f'В таблицу добавлено {len(rows)} проектов')
+        return spreadsheet_url
+
+    async def update_spreadsheet_async(
+        self,
+        projects: list[CharityProjectReport],
+        spreadsheet_id: Optional[str] = None,
+        clear: bool = True,
+        resize: bool = True
+    ) -> str:
+        """Обновляет таблицу, не блокируя цикл событий.
+
+        Вызовы gspread синхронные и ждут ответа Google на каждый запрос,
+        поэтому обновление выполняется в пуле потоков, а приложение
+        продолжает обслуживать другие запросы.
+        """
+        return await run_in_threadpool(
+            self.update_spreadsheet, projects, spreadsheet_id, clear, resize
+        )
+
+    async def get_sheet_rows_count_async(
+        self, spreadsheet_id: Optional[str] = None
+    ) -> int:
+        """Получает количество строк листа, не блокируя цикл событий."""
+        return await run_in_threadpool(
+            self.get_sheet_rows_count, spreadsheet_id
+        )
+
+    async def insert_report_rows_async(
+        self,
+        rows: list[tuple[int, CharityProjectReport]],
+        spreadsheet_id: Optional[str] = None
+    ) -> str:
+        """Вставляет строки в отчет, не блокируя цикл событий."""
+        return await run_in_threadpool(
+            self.insert_report_rows, rows, spreadsheet_id
+        )
+
 
-google_api_service = GoogleAPIService()
+google_api_service = GoogleAPIService(google_client_provider)
@@ -0,0 +1,167 @@
+"""Выгрузка отчета о закрытых проектах в Google Таблицу.
+
+Отчет выгружается целиком или инкрементально. Закрытые проекты больше
+не меняются, поэтому после полной выгрузки достаточно вставлять в
+таблицу только еще не выгруженные проекты. Состояние выгруженного
+отчета (выгруженные проекты и количество строк на листе) хранится в
+базе данных, поэтому инкрементальную выгрузку может продолжить любой
+процесс приложения. Перед вставкой количество строк на листе
+сверяется с состоянием: если лист изменили в обход приложения или
+предыдущая выгрузка не завершилась, отчет выгружается целиком.
+
+Строки полной выгрузки можно читать из реплики: проекты, которые она
+еще не получила, добавит следующая инкрементальная выгрузка. Разность
+с выгруженными проектами и само состояние читаются только из основной
+базы данных.
+"""
+
+import asyncio
+import logging
+from typing import Callable, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.charity_project import charity_project_crud
+from app.crud.report_export import report_export_crud
+from app.service.constants import SPREADSHEET_URL
+from app.service.google_api import google_api_service
+
+logger = logging.getLogger(__name__)
+
+_export_locks = WeakKeyDictionary()
+
+
+async def _export_full_report(
+    session: AsyncSession,
+    read_session: AsyncSession,
+    spreadsheet_id: str,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> Tuple[Optional[str], int]:
+    """Перезаписывает отчет целиком частями.
+
+    Строки читаются из базы страницами по settings.report_chunk_size
+    в порядке отчета, и каждая страница дописывается в таблицу
+    отдельным batchUpdate, поэтому размер запроса и расход памяти не
+    зависят от числа закрытых проектов. Выгруженные проекты
+    сохраняются после записи каждой части, а количество строк на
+    листе - только после записи последней части.
+    """
+    sheet_id = settings.spreadsheet_sheet_id
+    await report_export_crud.remove_by_sheet(
+        spreadsheet_id, sheet_id, session
+    )
+    chunk_size = settings.report_chunk_size
+    export = None
+    written = 0
+    after = None
+    while True:
+        rows = await charity_project_crud.get_report_rows(
+            read_session, limit=chunk_size + 1, after=after
+        )
+        if not rows and not written:
+            return None, 0
+        page = rows[:chunk_size]
+        is_last = len(rows) <= chunk_size
+        spreadsheet_url = await google_api_service.update_spreadsheet_async(
+            [charity_project_crud.build_report(row) for row in page],
+            spreadsheet_id,
+            clear=not written,
+            resize=is_last
+        )
+        if export is None:
+            export = await report_export_crud.create_for_sheet(
+                spreadsheet_id, sheet_id, session
+            )
+        await report_export_crud.add_rows(export, page, session)
+        written += len(page)
+        logger.info(f'В отчет записано {written} строк')
+        if on_progress is not None:
+            on_progress(written)
+        if is_last:
+            break
+        after = charity_project_crud.get_report_sort_key(page[-1])
+    await report_export_crud.add_rows(
+        export, [], session, rows_count=written
+    )
+    return spreadsheet_url, written
+
+
+async def export_report(
+    session: AsyncSession,
+    incremental: bool = False,
+    spreadsheet_id: Optional[str] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    read_session: Optional[AsyncSession] = None
+) -> Tuple[Optional[str], int]:
+    """Выгружает отчет о закрытых проектах в таблицу.
+
+    Инкрементальная выгрузка выбирает закрытые проекты, которых еще
+    нет среди выгруженных, вместе с количеством выгруженных строк
+    перед каждым из них, и вставляет их на свои места одним запросом
+    batchUpdate. Состояние отчета записывается в базу, поэтому нужна
+    сессия основной базы данных.
+
+    Args:
+        session: Асинхронная сессия основной базы данных
+        incremental: Добавить только новые проекты
+        spreadsheet_id: ID таблицы (опционально)
+        on_progress: Функция, получающая число уже записанных строк
+                     после каждой части полной выгрузки (опционально)
+        read_session: Сессия, из которой читаются строки полной
+                      выгрузки (опционально, по умолчанию session)
+
+    Returns:
+        Tuple[Optional[str], int]: Ссылка на таблицу (None, если
+        закрытых проектов нет) и количество выгруженных проектов
+    """
+    spreadsheet_id = spreadsheet_id or settings.spreadsheet_id
+    lock = _export_locks.setdefault(
+        asyncio.get_running_loop(), asyncio.Lock()
+    )
+    async with lock:
+        export = None
+        if incremental:
+            export = await report_export_crud.get_by_sheet(
+                spreadsheet_id, settings.spreadsheet_sheet_id, session
+            )
+        if export is not None and export.rows_count + 1 != (
+            await google_api_service.get_sheet_rows_count_async(
+                spreadsheet_id
+            )
+        ):
+            logger.warning(
+                'Лист отчета не совпадает с сохраненным состоянием, '
+                'отчет выгружается целиком'
+            )
+            export = None
+        if export is None:
+            return await _export_full_report(
+                session, read_session or session, spreadsheet_id,
+                on_progress
+            )
+        projects = await report_export_crud.get_unexported_rows(
+            export.id, session
+        )
+        if not projects:
+            return SPREADSHEET_URL.format(spreadsheet_id), 0
+        spreadsheet_url = await google_api_service.insert_report_rows_async(
+            [
+                (
+                    project.exported_before + number + 1,
+                    charity_project_crud.build_report(project)
+                )
+                for number, project in enumerate(projects)
+            ],
+            spreadsheet_id
+        )
+        if not await report_export_crud.add_rows(
+            export, projects, session,
+            rows_count=export.rows_count + len(projects)
+        ):
+            logger.warning(
+                'Состояние отчета изменено другим процессом, следующая '
+                'выгрузка перезапишет отчет целиком'
+            )
+        return spreadsheet_url, len(projects)
@@ -0,0 +1,188 @@
+"""Кэш незакрытых проектов и пожертвований в памяти процесса.
+
+Кэш позволяет распределять средства без запроса списка открытых
+объектов к базе данных. Изменения, подготовленные в транзакции,
+применяются к кэшу после успешного коммита, а при ошибке или
+расхождении с базой соответствующий пул сбрасывается и при следующем
+обращении заново читается из базы.
+
+Кэш рассчитан только на один процесс приложения с базой SQLite:
+все записи проходят через общую блокировку процесса, поэтому пул
+видит каждую новую строку без запросов к базе. Настройки не позволяют
+включить кэш для другой базы или нескольких рабочих процессов.
+Изменения строк в обход приложения обнаруживает условный UPDATE при
+распределении, а остальные расхождения ограничены временем жизни пула
+settings.open_pool_cache_ttl.
+"""
+
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Type
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.base import CRUDBase
+
+PENDING_CHANGES_KEY = 'open_pool_changes'
+COMPACT_THRESHOLD = 1024
+
+
+def _to_timestamp(value: datetime) -> float:
+    """Переводит дату создания в секунды UTC для сравнения."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class OpenPool:
+    """Незакрытые объекты одной модели в порядке создания.
+
+    Идентификаторы, нераспределенные остатки и даты создания хранятся
+    в массивах array, позиция head указывает на первый незакрытый
+    объект. Закрытые объекты удаляются сдвигом head, а массивы
+    периодически уплотняются. loaded_at - время чтения пула из базы.
+    """
+
+    def __init__(self, rows: list):
+        self.ids = array('q')
+        self.remaining = array('q')
+        self.create_dates = array('d')
+        self.head = 0
+        self.loaded_at = time.monotonic()
+        for row in rows:
+            self.append(row.id, row.remaining, row.create_date)
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.head
+
+    def append(
+        self, obj_id: int, remaining: int, create_date: datetime
+    ) -> None:
+        """Добавляет незакрытый объект с сохранением порядка создания."""
+        timestamp = _to_timestamp(create_date)
+        position = len(self.ids)
+        if position > self.head and timestamp < self.create_dates[-1]:
+            position = bisect_right(self.create_dates, timestamp, self.head)
+        self.ids.insert(position, obj_id)
+        self.remaining.insert(position, remaining)
+        self.create_dates.insert(position, timestamp)
+
+    def slots(self) -> Iterator[SimpleNamespace]:
+        """Перебирает объекты пула в виде источников для распределения.
+
+        Каждый слот повторяет поля модели, которые использует
+        распределение средств: full_amount равен остатку объекта,
+        а invested_amount накапливает распределенную из него сумму.
+
+        Yields:
+            SimpleNamespace: Слот с id, position и полями инвестирования
+        """
+        for position in range(self.head, len(self.ids)):
+            yield SimpleNamespace(
+                id=self.ids[position],
+                position=position,
+                full_amount=self.remaining[position],
+                invested_amount=0,
+                fully_invested=False,
+                close_date=None,
+            )
+
+    def consume(self, slots: List[SimpleNamespace]) -> None:
+        """Учитывает средства, распределенные из слотов пула."""
+        for slot in slots:
+            if slot.fully_invested:
+                self.head = max(self.head, slot.position + 1)
+            else:
+                self.remaining[slot.position] -= slot.invested_amount
+        if self.head > COMPACT_THRESHOLD and self.head * 2 > len(self.ids):
+            del self.ids[:self.head]
+            del self.remaining[:self.head]
+            del self.create_dates[:self.head]
+            self.head = 0
+
+
+class OpenPoolCache:
+    """Пулы незакрытых объектов для каждой модели."""
+
+    def __init__(self):
+        self._pools: Dict[Type, OpenPool] = {}
+
+    async def get(self, crud: CRUDBase, session: AsyncSession) -> OpenPool:
+        """Возвращает пул модели, при необходимости читая его из базы.
+
+        Пул перечитывается, если он еще не загружен или устарел.
+
+        Args:
+            crud: CRUD модели, пул которой нужен
+            session: Асинхронная сессия базы данных
+
+        Returns:
+            OpenPool: Пул незакрытых объектов модели
+        """
+        pool = self._pools.get(crud.model)
+        if pool is None or (
+            time.monotonic() - pool.loaded_at > settings.open_pool_cache_ttl
+        ):
+            pool = OpenPool(await crud.get_open_pool_rows(session))
+            self._pools[crud.model] = pool
+        return pool
+
+    def invalidate(self, *models: Type) -> None:
+        """Сбрасывает пулы указанных моделей или все пулы."""
+        if not models:
+            self._pools.clear()
+        for model in models:
+            self._pools.pop(model, None)
+
+    def add_pending(
+        self,
+        session: AsyncSession,
+        source_model: Type,
+        slots: List[SimpleNamespace],
+        target_model: Type,
+        targets: list,
+    ) -> None:
+        """Запоминает изменения пулов до коммита транзакции.
+
+        Args:
+            session: Сессия, в транзакции которой сделаны изменения
+            source_model: Модель, из пула которой распределены средства
+            slots: Затронутые слоты пула источников
+            target_model: Модель новых объектов
+            targets: Новые объекты с уже назначенными id
+        """
+        session.info.setdefault(PENDING_CHANGES_KEY, []).append(
+            (source_model, slots, target_model, [
+                (target.id, target.full_amount - target.invested_amount,
+                 target.create_date)
+                for target in targets if not target.fully_invested
+            ])
+        )
+
+    def apply_pending(self, session: AsyncSession) -> None:
+        """Применяет к пулам изменения закоммиченной транзакции."""
+        changes = session.info.pop(PENDING_CHANGES_KEY, [])
+        for source_model, slots, target_model, open_targets in changes:
+            source_pool = self._pools.get(source_model)
+            if source_pool is not None:
+                source_pool.consume(slots)
+            target_pool = self._pools.get(target_model)
+            if target_pool is None:
+                continue
+            for target in open_targets:
+                target_pool.append(*target)
+
+    def discard_pending(self, session: AsyncSession) -> None:
+        """Отбрасывает изменения откаченной транзакции."""
+        session.info.pop(PENDING_CHANGES_KEY, None)
+
+    def peek(self, model: Type) -> Optional[OpenPool]:
+        """Возвращает пул модели, если он уже загружен."""
+        return self._pools.get(model)
+
+
+open_pool_cache = OpenPoolCache()
@@ -0,0 +1,41 @@
+"""Вспомогательные функции для постраничной выдачи списков."""
+
+from typing import List, Optional, TypeVar
+
+from fastapi import Request, Response
+
+ItemType = TypeVar('ItemType')
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def paginate(
+    items: List[ItemType],
+    limit: Optional[int],
+    request: Request,
+    response: Response,
+) -> List[ItemType]:
+    """Обрезает страницу и добавляет ссылку на следующую страницу.
+
+    Ожидает, что из базы запрошено на один объект больше limit: его
+    наличие означает, что следующая страница существует. Курсором
+    следующей страницы служит id последнего объекта текущей страницы,
+    он передается в заголовках Link (rel="next") и X-Next-Cursor.
+
+    Args:
+        items: Объекты, полученные с лимитом limit + 1
+        limit: Размер страницы или None, если выдача не постраничная
+        request: Текущий запрос
+        response: Ответ, в который добавляются заголовки
+
+    Returns:
+        List: Объекты текущей страницы
+    """
+    if limit is None or len(items) <= limit:
+        return items
+    page = items[:limit]
+    next_cursor = str(page[-1].id)
+    next_url = request.url.include_query_params(after=next_cursor)
+    response.headers['Link'] = f'<{next_url}>; rel="next"'
+    response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return page
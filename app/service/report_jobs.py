@@ -0,0 +1,126 @@
+"""Фоновое формирование отчета в Google Таблице.
+
+Задачи выполняются в процессе приложения без внешних брокеров:
+поставленные задачи обрабатываются по очереди одной фоновой asyncio
+задачей, которая запускается при постановке первой задачи и
+завершается, когда очередь пуста. Повторный запрос на обновление
+отчета, пока предыдущая задача ждет или выполняется, возвращает уже
+поставленную задачу, если она обновляет отчет не менее полно.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncReadSessionLocal, AsyncSessionLocal
+from app.schemas.report_job import ReportJobDB, ReportJobStatus
+from app.service.constants import REPORT_JOBS_HISTORY_SIZE
+from app.service.google_report import export_report
+
+logger = logging.getLogger(__name__)
+
+
+class ReportJobQueue:
+    """Очередь задач обновления отчета с локальным обработчиком.
+
+    Задачи работают в сессиях основной базы данных из session_factory,
+    а строки полной выгрузки читают в сессиях read_session_factory
+    (по умолчанию тоже основной базы).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        read_session_factory: Optional[Callable[[], AsyncSession]] = None
+    ):
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory or session_factory
+        self._jobs: OrderedDict[str, ReportJobDB] = OrderedDict()
+        self._pending: deque = deque()
+        self._running: Optional[str] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, incremental: bool = False) -> ReportJobDB:
+        """Ставит задачу обновления отчета в очередь.
+
+        Если уже есть выполняющаяся или ожидающая задача, которая
+        обновляет отчет целиком или так же инкрементально, новая не
+        создается. Выполняющаяся задача может не учесть изменения,
+        закоммиченные после чтения ею данных: они попадут в отчет при
+        следующем обновлении.
+
+        Args:
+            incremental: Добавить в отчет только новые закрытые проекты
+
+        Returns:
+            ReportJobDB: Поставленная или уже ожидающая задача
+        """
+        active = [self._running] if self._running else []
+        for job_id in [*active, *self._pending]:
+            if incremental or not self._jobs[job_id].incremental:
+                return self._jobs[job_id]
+        job = ReportJobDB(
+            id=uuid4().hex,
+            incremental=incremental,
+            create_date=datetime.now(timezone.utc)
+        )
+        self._jobs[job.id] = job
+        self._pending.append(job.id)
+        self._forget_finished()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._process_pending())
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJobDB]:
+        """Возвращает задачу по идентификатору."""
+        return self._jobs.get(job_id)
+
+    def _forget_finished(self) -> None:
+        """Удаляет самые старые завершенные задачи сверх лимита истории."""
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in (ReportJobStatus.done, ReportJobStatus.failed)
+        ]
+        for job_id in finished[:-REPORT_JOBS_HISTORY_SIZE]:
+            del self._jobs[job_id]
+
+    async def _process_pending(self) -> None:
+        """Выполняет задачи из очереди, пока она не опустеет."""
+        while self._pending:
+            self._running = self._pending.popleft()
+            job = self._jobs[self._running]
+            job.status = ReportJobStatus.running
+            try:
+                await self._run(job)
+                job.status = ReportJobStatus.done
+            except Exception as error:
+                logger.exception(f'Ошибка формирования отчета {job.id}')
+                job.error = str(
+                    error.detail if isinstance(error, HTTPException)
+                    else error
+                )
+                job.status = ReportJobStatus.failed
+            finally:
+                self._running = None
+            job.close_date = datetime.now(timezone.utc)
+
+    async def _run(self, job: ReportJobDB) -> None:
+        """Читает закрытые проекты и записывает их в таблицу."""
+        async with self.session_factory() as session, (
+            self.read_session_factory()
+        ) as read_session:
+            job.spreadsheet_url, job.projects_count = await export_report(
+                session,
+                job.incremental,
+                on_progress=lambda written: setattr(job, 'progress', written),
+                read_session=read_session
+            )
+
+
+report_jobs = ReportJobQueue(AsyncSessionLocal, AsyncReadSessionLocal)
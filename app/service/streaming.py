@@ -0,0 +1,33 @@
+"""Потоковая выдача больших списков в формате JSON."""
+
+from typing import AsyncIterator, Type
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncScalarResult
+
+
+async def stream_json_array(
+    result: AsyncScalarResult,
+    schema: Type[BaseModel],
+) -> AsyncIterator[str]:
+    """Сериализует объекты курсора в JSON-массив по одному элементу.
+
+    Объекты читаются из базы пачками и сразу отдаются клиенту, поэтому
+    потребление памяти не зависит от длины списка. Курсор закрывается
+    по окончании выдачи.
+
+    Args:
+        result: Потоковый результат запроса к базе данных
+        schema: Pydantic-схема для сериализации объектов
+
+    Yields:
+        str: Фрагменты JSON-массива
+    """
+    separator = '['
+    try:
+        async for db_obj in result:
+            yield separator + schema.from_orm(db_obj).json(exclude_none=True)
+            separator = ','
+    finally:
+        await result.close()
+    yield '[]' if separator == '[' else ']'
@@ -48,6 +48,7 @@ BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 pytest_plugins = [
     'fixtures.user',
     'fixtures.data',
+    'fixtures.queries',
 ]
 
 TEST_DB = BASE_DIR / 'test.db'
@@ -58,6 +59,7 @@ engine = create_async_engine(
 )
 TestingSessionLocal = sessionmaker(
     class_=AsyncSession, autocommit=False, autoflush=False, bind=engine,
+    expire_on_commit=False,
 )
 
 
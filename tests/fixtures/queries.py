@@ -0,0 +1,16 @@
+import pytest
+from conftest import engine
+from sqlalchemy import event
+
+
+@pytest.fixture
+def query_counter():
+    statements = []
+
+    def count_query(conn, cursor, statement, parameters, context,
+                    executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_query)
+    yield statements
+    event.remove(engine.sync_engine, 'before_cursor_execute', count_query)
@@ -5,6 +5,7 @@ from conftest import (
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
+from app.core.db import get_async_read_session
 from app.models.user import User
 
 superuser = User(
@@ -36,6 +37,7 @@ def user_client():
 
     app.dependency_overrides = {}
     app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[get_async_read_session] = override_db
     app.dependency_overrides[current_user] = lambda: user
     app.dependency_overrides[current_superuser] = (
         lambda: raise_forbidden()
@@ -48,6 +50,7 @@ def user_client():
 def test_client():
     app.dependency_overrides = {}
     app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[get_async_read_session] = override_db
     app.dependency_overrides[current_user] = lambda: not_auth_user
     with TestClient(app) as client:
         yield client
@@ -57,6 +60,7 @@ def test_client():
 def superuser_client():
     app.dependency_overrides = {}
     app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[get_async_read_session] = override_db
     app.dependency_overrides[current_superuser] = lambda: superuser
     with TestClient(app) as client:
         yield client
@@ -5,6 +5,7 @@ import pytest
 
 PROJECTS_URL = '/charity_project/'
 PROJECT_DETAILS_URL = PROJECTS_URL + '{project_id}'
+BATCH_PROJECTS_URL = PROJECTS_URL + 'batch'
 
 
 @pytest.mark.parametrize(
@@ -728,3 +729,113 @@ def test_get_all_charity_project_not_auth_user(test_client):
         f'пользователя к эндпоинту `{PROJECTS_URL}` возвращается список '
         'существующих проектов.'
     )
+
+
+def test_create_charity_projects_batch(superuser_client, donation,
+                                       another_donation):
+    response = superuser_client.post(BATCH_PROJECTS_URL, json=[
+        {'name': 'Мертвый Бассейн', 'description': 'Deadpool',
+         'full_amount': 50},
+        {'name': 'Росомаха', 'description': 'Wolverine',
+         'full_amount': 1000},
+    ])
+    assert response.status_code == 200, (
+        'Корректный POST-запрос суперпользователя к эндпоинту '
+        f'`{BATCH_PROJECTS_URL}` должен вернуть ответ со статус-кодом 200.'
+    )
+    data = response.json()
+    assert [
+        (project['name'], project['invested_amount'],
+         project['fully_invested'])
+        for project in data
+    ] == [('Мертвый Бассейн', 50, True), ('Росомаха', 1000, True)], (
+        'Открытые пожертвования должны распределяться по проектам из пакета '
+        'в порядке их следования в запросе.'
+    )
+    assert donation.fully_invested, (
+        'После создания пакета проектов пожертвования должны быть '
+        'израсходованы в порядке их создания.'
+    )
+    assert another_donation.invested_amount == 950, (
+        'После создания пакета проектов пожертвования должны быть '
+        'израсходованы в порядке их создания.'
+    )
+
+
+@pytest.mark.parametrize('names', [
+    ['chimichangas4life', 'Росомаха'],
+    ['Росомаха', 'Росомаха'],
+])
+def test_create_charity_projects_batch_same_name(superuser_client,
+                                                 charity_project, names):
+    response = superuser_client.post(BATCH_PROJECTS_URL, json=[
+        {'name': name, 'description': 'Описание', 'full_amount': 100}
+        for name in names
+    ])
+    assert response.status_code == 400, (
+        'Если название проекта из пакета уже занято или повторяется в '
+        f'пакете, POST-запрос к эндпоинту `{BATCH_PROJECTS_URL}` должен '
+        'вернуть ответ со статус-кодом 400.'
+    )
+    assert len(superuser_client.get(PROJECTS_URL).json()) == 1, (
+        'При ошибке в пакете ни один проект из него не должен создаваться.'
+    )
+
+
+def test_create_charity_projects_batch_name_check_in_chunks(
+        superuser_client, charity_project, monkeypatch
+):
+    monkeypatch.setattr(
+        'app.crud.charity_project.IN_QUERY_CHUNK_SIZE', 2
+    )
+    response = superuser_client.post(BATCH_PROJECTS_URL, json=[
+        {'name': name, 'description': 'Описание', 'full_amount': 100}
+        for name in ['Росомаха', 'Дэдпул', 'Колосс', 'chimichangas4life']
+    ])
+    assert response.status_code == 400, (
+        'Занятое название должно находиться и тогда, когда проверка '
+        'названий пакета выполняется несколькими запросами.'
+    )
+
+
+def test_create_charity_projects_batch_usual_user(user_client):
+    response = user_client.post(BATCH_PROJECTS_URL, json=[
+        {'name': 'Росомаха', 'description': 'Wolverine', 'full_amount': 100},
+    ])
+    assert response.status_code == 403, (
+        'Пакетное создание проектов должно быть доступно только '
+        'суперпользователю.'
+    )
+
+
+@pytest.mark.usefixtures('charity_project', 'charity_project_nunchaku')
+def test_get_charity_projects_page(user_client):
+    response = user_client.get(PROJECTS_URL, params={'limit': 1})
+    assert response.status_code == 200, (
+        f'GET-запрос к эндпоинту `{PROJECTS_URL}` с параметром `limit` '
+        'должен вернуть ответ со статус-кодом 200.'
+    )
+    assert [project['name'] for project in response.json()] == [
+        'chimichangas4life'
+    ], (
+        f'GET-запрос к эндпоинту `{PROJECTS_URL}` с параметром `limit` '
+        'должен возвращать не больше `limit` проектов в порядке `id`.'
+    )
+    assert response.headers.get('X-Next-Cursor') == '1', (
+        'Если есть следующая страница, в заголовке `X-Next-Cursor` должен '
+        'передаваться `id` последнего проекта текущей страницы.'
+    )
+    assert 'after=1' in response.headers.get('Link', ''), (
+        'Если есть следующая страница, в заголовке `Link` должна '
+        'передаваться ссылка на нее.'
+    )
+    response = user_client.get(PROJECTS_URL, params={'limit': 1, 'after': 1})
+    assert [project['name'] for project in response.json()] == [
+        'nunchaku'
+    ], (
+        'Следующая страница должна начинаться с проекта, идущего после '
+        '`after`.'
+    )
+    assert 'Link' not in response.headers, (
+        'На последней странице заголовок `Link` передаваться не должен.'
+    )
@@ -2,10 +2,16 @@ import time
 from datetime import datetime
 
 import pytest
+from conftest import engine
+from sqlalchemy import text
+
+from app.crud.donation import donation_crud
+from app.models import User
 
 DONATIONS_URL = '/donation/'
 DONATON_DETAILS_URL = DONATIONS_URL + '{donation_id}'
 MY_DONATIONS_URL = DONATIONS_URL + 'my'
+BATCH_DONATIONS_URL = DONATIONS_URL + 'batch'
 
 
 @pytest.mark.parametrize('json_data, expected_keys, expected_data', [
@@ -221,3 +227,164 @@ def test_create_donation_check_create_date(user_client):
         'Убедитесь, что при неодновременном создании двух пожертвований '
         'у них отличаются значения в поле `create_date`.'
     )
+
+
+def test_create_donations_batch(user_client, charity_project,
+                                charity_project_nunchaku):
+    response = user_client.post(BATCH_DONATIONS_URL, json=[
+        {'full_amount': 600000, 'comment': 'Первое'},
+        {'full_amount': 500000},
+    ])
+    assert response.status_code == 200, (
+        'Корректный POST-запрос зарегистрированного пользователя к эндпоинту '
+        f'`{BATCH_DONATIONS_URL}` должен возвращать ответ со статус-кодом 200.'
+    )
+    data = response.json()
+    assert [donation['full_amount'] for donation in data] == [
+        600000, 500000
+    ], (
+        f'Ответ на POST-запрос к эндпоинту `{BATCH_DONATIONS_URL}` должен '
+        'содержать созданные пожертвования в порядке следования в запросе.'
+    )
+    assert data[0]['comment'] == 'Первое' and len({
+        donation['id'] for donation in data
+    }) == 2, (
+        f'Каждое пожертвование из запроса к `{BATCH_DONATIONS_URL}` должно '
+        'сохраняться отдельным объектом.'
+    )
+    assert charity_project.fully_invested, (
+        'Пакет пожертвований должен распределяться по проектам так же, как '
+        'последовательность отдельных пожертвований.'
+    )
+    assert charity_project_nunchaku.invested_amount == 100000, (
+        'Остаток второго пожертвования из пакета должен перейти в следующий '
+        'открытый проект.'
+    )
+
+
+@pytest.mark.parametrize('json_data', [
+    [],
+    [{'full_amount': 100}, {'full_amount': -1}],
+])
+def test_create_donations_batch_invalid(user_client, json_data):
+    response = user_client.post(BATCH_DONATIONS_URL, json=json_data)
+    assert response.status_code == 422, (
+        'При пустом списке или некорректном пожертвовании в теле запроса '
+        f'к эндпоинту `{BATCH_DONATIONS_URL}` должен вернуться '
+        'статус-код 422.'
+    )
+
+
+def test_get_all_donations_stream(superuser_client, donation,
+                                  another_donation):
+    expected = superuser_client.get(DONATIONS_URL).json()
+    response = superuser_client.get(DONATIONS_URL, params={'stream': True})
+    assert response.status_code == 200, (
+        'GET-запрос суперпользователя к эндпоинту '
+        f'`{DONATIONS_URL}?stream=true` должен вернуть ответ со '
+        'статус-кодом 200.'
+    )
+    assert response.headers['content-type'] == 'application/json', (
+        'Потоковый список пожертвований должен отдаваться в формате JSON.'
+    )
+    assert response.json() == expected, (
+        'Потоковый список пожертвований должен совпадать с обычным.'
+    )
+
+
+def test_get_all_donations_stream_empty(superuser_client):
+    response = superuser_client.get(DONATIONS_URL, params={'stream': True})
+    assert response.json() == [], (
+        'При отсутствии пожертвований потоковый список должен быть пустым.'
+    )
+
+
+def test_get_user_donations_paginated(user_client, freezer,
+                                      another_donation):
+    donations = []
+    for day in (3, 1, 2, 2):
+        freezer.move_to(f'2020-01-0{day}')
+        response = user_client.post(DONATIONS_URL, json={'full_amount': 10})
+        donations.append(response.json())
+    expected_ids = [
+        donation['id'] for donation in sorted(
+            donations,
+            key=lambda donation: (donation['create_date'], donation['id']),
+            reverse=True,
+        )
+    ]
+    received_ids = []
+    params = {'limit': 3}
+    while True:
+        response = user_client.get(MY_DONATIONS_URL, params=params)
+        assert response.status_code == 200, (
+            'GET-запрос с параметром `limit` к эндпоинту '
+            f'`{MY_DONATIONS_URL}` должен вернуть статус-код 200.'
+        )
+        page = response.json()
+        assert len(page) <= 3, (
+            'Страница не должна содержать больше `limit` пожертвований.'
+        )
+        received_ids.extend(donation['id'] for donation in page)
+        if 'X-Next-Cursor' not in response.headers:
+            break
+        params['after'] = response.headers['X-Next-Cursor']
+    assert received_ids == expected_ids, (
+        'Постраничная выдача пожертвований пользователя должна вернуть '
+        'все его пожертвования от новых к старым без пропусков и повторов.'
+    )
+
+
+@pytest.mark.parametrize('after', [None, 1])
+async def test_user_donations_query_uses_index(after):
+    query = donation_crud.get_by_user_query(
+        User(id=2), limit=20, after=after
+    ).compile(
+        dialect=engine.dialect, compile_kwargs={'literal_binds': True}
+    )
+    async with engine.connect() as conn:
+        plan = await conn.execute(text(f'EXPLAIN QUERY PLAN {query}'))
+        details = [row[-1] for row in plan]
+    assert any(
+        'ix_donation_user_id_create_date_id' in detail
+        for detail in details
+    ), (
+        'Выборка пожертвований пользователя должна использовать индекс '
+        '`ix_donation_user_id_create_date_id`.'
+    )
+    assert not any('TEMP B-TREE' in detail for detail in details), (
+        'Пожертвования пользователя должны выбираться в порядке индекса '
+        'без дополнительной сортировки.'
+    )
+
+
+def test_get_user_donations_without_limit_keeps_order(user_client, freezer):
+    donation_ids = []
+    for day in (3, 1, 2):
+        freezer.move_to(f'2020-01-0{day}')
+        response = user_client.post(DONATIONS_URL, json={'full_amount': 10})
+        donation_ids.append(response.json()['id'])
+    response = user_client.get(MY_DONATIONS_URL)
+    assert [donation['id'] for donation in response.json()] == (
+        donation_ids
+    ), (
+        f'Без параметра `limit` эндпоинт `{MY_DONATIONS_URL}` должен '
+        'возвращать пожертвования в порядке их создания, как и раньше.'
+    )
+
+
+@pytest.mark.parametrize('cursor', ['foreign', 'unknown'])
+def test_get_user_donations_invalid_after(user_client, donation,
+                                          another_donation, cursor):
+    foreign_donation, = [
+        obj for obj in (donation, another_donation) if obj.user_id != 2
+    ]
+    after = foreign_donation.id if cursor == 'foreign' else 999
+    response = user_client.get(
+        MY_DONATIONS_URL, params={'limit': 1, 'after': after}
+    )
+    assert response.status_code == 400, (
+        'Если пожертвование из параметра `after` не существует или '
+        'принадлежит другому пользователю, GET-запрос к эндпоинту '
+        f'`{MY_DONATIONS_URL}` должен вернуть статус-код 400.'
+    )
@@ -1,4 +1,11 @@
 import types
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.oauth2.service_account import Credentials
+
 try:
     from app.core import google_client
 except (NameError, ImportError):
@@ -55,3 +62,80 @@ def test_connect():
         'Функция `google_client.get_service` должна возвращать асинхронный '
         'генератор.'
     )
+
+
+@pytest.fixture(scope='module')
+def service_account_info():
+    private_key = rsa.generate_private_key(
+        public_exponent=65537, key_size=2048
+    ).private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return {
+        'type': 'service_account',
+        'project_id': 'qrkot-test',
+        'private_key_id': 'key-id',
+        'private_key': private_key,
+        'client_email': 'qrkot@qrkot-test.iam.gserviceaccount.com',
+        'client_id': '1',
+        'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
+        'token_uri': 'https://oauth2.googleapis.com/token',
+        'auth_provider_x509_cert_url': (
+            'https://www.googleapis.com/oauth2/v1/certs'
+        ),
+        'client_x509_cert_url': (
+            'https://www.googleapis.com/robot/v1/metadata/x509/qrkot'
+        ),
+    }
+
+
+def test_client_provider_reuses_client_and_refreshes_ahead(
+        monkeypatch, service_account_info
+):
+    refreshes = []
+
+    def refresh(credentials, request):
+        refreshes.append(request)
+        credentials.token = 'token'
+        credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, 'refresh', refresh)
+    provider = google_client.GoogleClientProvider(
+        service_account_info, google_client.SCOPES
+    )
+    client = provider.get_client()
+    assert provider.get_client() is client, (
+        'Провайдер должен переиспользовать один клиент Google Sheets.'
+    )
+    assert len(refreshes) == 1, (
+        'Токен доступа должен запрашиваться один раз, пока он действует.'
+    )
+    client.auth.expiry = datetime.utcnow() + timedelta(minutes=1)
+    provider.get_client()
+    assert len(refreshes) == 2, (
+        'Токен доступа должен обновляться заранее, до истечения.'
+    )
+    assert refreshes[0] is refreshes[1], (
+        'Для обновления токена должна использоваться общая HTTP-сессия.'
+    )
+
+
+def test_client_provider_requires_credentials(service_account_info):
+    info = dict(service_account_info)
+    del info['private_key']
+    provider = google_client.GoogleClientProvider(
+        info, google_client.SCOPES
+    )
+    try:
+        provider.get_client()
+    except google_client.GoogleSheetsServiceError as error:
+        assert 'private_key' in str(error), (
+            'При отсутствии ключа провайдер должен сообщать, какого '
+            'поля не хватает.'
+        )
+    else:
+        raise AssertionError(
+            'Без учетных данных провайдер не должен создавать клиент.'
+        )
@@ -0,0 +1,476 @@
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from conftest import TestingSessionLocal, engine
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.endpoints.google import update_google_report
+from app.core.config import settings
+from app.crud.charity_project import charity_project_crud
+from app.crud.report_export import report_export_crud
+from app.models import CharityProject
+from app.service import google_report
+from app.service.google_api import google_api_service
+from app.service.report_jobs import ReportJobQueue, report_jobs
+
+JOBS_URL = '/google/jobs'
+
+SHEETS_CALL_DELAY = 0.05
+
+
+class StubClient:
+    """Клиент Sheets, каждый запрос которого блокирует поток.
+
+    Запросы batchUpdate запоминаются в requests, а количество строк
+    на листе пересчитывается по ним и отдается при чтении первой
+    колонки листа.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.rows = 0
+        self.reads = 0
+
+    def request(self, method, endpoint, json=None):
+        time.sleep(SHEETS_CALL_DELAY)
+        if endpoint.endswith(':batchGetByDataFilter'):
+            self.reads += 1
+            return SimpleNamespace(json=lambda: {'valueRanges': [{
+                'valueRange': {'values': [['value'] * self.rows]}
+            }]})
+        self.requests.append((method, endpoint, json))
+        for request in json['requests']:
+            if 'range' in request.get('updateCells', {}):
+                self.rows = 0
+            elif 'appendCells' in request:
+                self.rows += len(request['appendCells']['rows'])
+            elif 'insertDimension' in request:
+                self.rows += 1
+
+
+@pytest.fixture
+def sheets_client(monkeypatch):
+    client = StubClient()
+    monkeypatch.setattr(
+        google_api_service.provider, 'get_client', lambda: client
+    )
+    monkeypatch.setattr(settings, 'spreadsheet_id', 'report')
+    monkeypatch.setattr(report_jobs, 'session_factory', TestingSessionLocal)
+    monkeypatch.setattr(
+        report_jobs, 'read_session_factory', TestingSessionLocal
+    )
+    return client
+
+
+async def create_closed_project(name='closed', days=1, close_day=2):
+    async with TestingSessionLocal() as session:
+        session.add(CharityProject(
+            name=name,
+            description='Закрытый проект',
+            full_amount=100,
+            invested_amount=100,
+            fully_invested=True,
+            create_date=datetime(2020, 1, close_day - days),
+            close_date=datetime(2020, 1, close_day),
+        ))
+        await session.commit()
+
+
+async def update_report_incrementally():
+    async with TestingSessionLocal() as session:
+        return await update_google_report(
+            session, session, incremental=True
+        )
+
+
+async def test_report_does_not_block_event_loop(sheets_client):
+    await create_closed_project()
+    ticks = 0
+    report_done = asyncio.Event()
+
+    async def serve_other_requests():
+        nonlocal ticks
+        while not report_done.is_set():
+            await asyncio.sleep(SHEETS_CALL_DELAY / 20)
+            ticks += 1
+
+    async def write_report():
+        async with TestingSessionLocal() as session:
+            try:
+                return await update_google_report(session, session)
+            finally:
+                report_done.set()
+
+    result, _ = await asyncio.gather(write_report(), serve_other_requests())
+    assert result['spreadsheet_url'].endswith('/report'), (
+        'Эндпоинт отчета должен вернуть ссылку на обновленную таблицу.'
+    )
+    assert ticks >= 5, (
+        'Во время записи отчета в Google Таблицу цикл событий должен '
+        'продолжать обслуживать другие запросы.'
+    )
+
+
+async def test_report_is_written_with_single_batch_update(sheets_client):
+    await create_closed_project()
+    async with TestingSessionLocal() as session:
+        await update_google_report(session, session)
+    assert len(sheets_client.requests) == 1, (
+        'Обновление отчета должно выполняться одним запросом к Google API.'
+    )
+    method, endpoint, body = sheets_client.requests[0]
+    assert method == 'post' and endpoint.endswith('/report:batchUpdate'), (
+        'Отчет должен обновляться запросом spreadsheets.batchUpdate.'
+    )
+    request_types = [next(iter(request)) for request in body['requests']]
+    assert request_types == [
+        'updateCells', 'appendCells', 'autoResizeDimensions'
+    ], (
+        'Запрос batchUpdate должен очищать лист, записывать строки отчета '
+        'и подбирать ширину колонок.'
+    )
+    rows = body['requests'][1]['appendCells']['rows']
+    assert [
+        cell['userEnteredValue'] for cell in rows[1]['values']
+    ] == [
+        {'stringValue': 'closed'},
+        {'stringValue': '1 дн. 00 ч. 00 мин.'},
+        {'stringValue': 'Закрытый проект'},
+        {'numberValue': 100},
+        {'stringValue': '2020-01-02 00:00'},
+    ], (
+        'Строка отчета должна содержать данные закрытого проекта.'
+    )
+
+
+async def test_report_jobs_deduplicate_pending_requests(sheets_client):
+    await create_closed_project()
+    queue = ReportJobQueue(TestingSessionLocal)
+    job = queue.submit()
+    assert queue.submit() is job, (
+        'Повторный запрос на обновление отчета, пока задача ждет '
+        'выполнения, должен вернуть ту же задачу.'
+    )
+    await queue._worker
+    assert job.status == 'done' and job.projects_count == 1, (
+        'Фоновая задача должна записать отчет по закрытым проектам.'
+    )
+    assert len(sheets_client.requests) == 1, (
+        'Несколько запросов на обновление отчета должны выполняться '
+        'одной задачей.'
+    )
+    assert queue.submit() is not job, (
+        'После завершения задачи запрос на обновление отчета должен '
+        'создавать новую задачу.'
+    )
+    await queue._worker
+
+
+async def test_report_jobs_deduplicate_running_job(sheets_client):
+    await create_closed_project()
+    queue = ReportJobQueue(TestingSessionLocal)
+    job = queue.submit(incremental=True)
+    while job.status != 'running':
+        await asyncio.sleep(0)
+    assert queue.submit(incremental=True) is job, (
+        'Повторный запрос на инкрементальное обновление отчета, пока '
+        'такая же задача выполняется, должен вернуть ее.'
+    )
+    full_job = queue.submit()
+    assert full_job is not job, (
+        'Запрос на полное обновление не должен объединяться с '
+        'выполняющейся инкрементальной задачей.'
+    )
+    await queue._worker
+    assert full_job.status == 'done', (
+        'Задача полного обновления должна выполниться после '
+        'инкрементальной.'
+    )
+
+
+def test_report_job_status_polling(superuser_client, sheets_client,
+                                   closed_charity_project):
+    response = superuser_client.post(JOBS_URL)
+    assert response.status_code == 202, (
+        f'POST-запрос к эндпоинту `{JOBS_URL}` должен вернуть '
+        'статус-код 202.'
+    )
+    job_url = f'{JOBS_URL}/{response.json()["id"]}'
+    for _ in range(100):
+        job = superuser_client.get(job_url).json()
+        if job['status'] in ('done', 'failed'):
+            break
+        time.sleep(SHEETS_CALL_DELAY)
+    assert job['status'] == 'done', (
+        f'GET-запрос к эндпоинту `{job_url}` должен показывать '
+        'завершение задачи обновления отчета.'
+    )
+    assert job['spreadsheet_url'].endswith('/report'), (
+        'Завершенная задача должна содержать ссылку на таблицу.'
+    )
+    response = superuser_client.get(f'{JOBS_URL}/unknown')
+    assert response.status_code == 404, (
+        'Запрос статуса несуществующей задачи должен вернуть '
+        'статус-код 404.'
+    )
+
+
+def test_report_jobs_forbidden_for_user(user_client):
+    response = user_client.post(JOBS_URL)
+    assert response.status_code in (401, 403), (
+        'Ставить обновление отчета в очередь может только суперпользователь.'
+    )
+
+
+async def test_incremental_report_inserts_only_new_rows(sheets_client):
+    await create_closed_project('fast', days=1, close_day=2)
+    await create_closed_project('slow', days=3, close_day=5)
+    result = await update_report_incrementally()
+    assert result['projects_count'] == 2, (
+        'Первая инкрементальная выгрузка должна записать отчет целиком.'
+    )
+    await create_closed_project('medium', days=2, close_day=10)
+    result = await update_report_incrementally()
+    assert result['projects_count'] == 1, (
+        'Инкрементальная выгрузка должна добавлять только новые проекты.'
+    )
+    assert len(sheets_client.requests) == 2, (
+        'Инкрементальная выгрузка должна выполняться одним запросом.'
+    )
+    requests = sheets_client.requests[1][2]['requests']
+    assert [next(iter(request)) for request in requests] == [
+        'insertDimension', 'updateCells', 'autoResizeDimensions'
+    ], (
+        'Инкрементальная выгрузка не должна перезаписывать весь лист.'
+    )
+    assert requests[0]['insertDimension']['range']['startIndex'] == 2, (
+        'Новая строка должна вставляться на свое место в порядке '
+        'скорости сбора средств.'
+    )
+    row = requests[1]['updateCells']['rows'][0]['values']
+    assert row[0]['userEnteredValue'] == {'stringValue': 'medium'}, (
+        'Вставленная строка должна содержать данные нового проекта.'
+    )
+    result = await update_report_incrementally()
+    assert result['projects_count'] == 0 and len(
+        sheets_client.requests
+    ) == 2, (
+        'Если новых закрытых проектов нет, таблица не должна обновляться.'
+    )
+
+
+async def test_incremental_report_rows_positions_match_full_sort(
+        sheets_client
+):
+    for number, days in enumerate((1, 4, 6)):
+        await create_closed_project(f'old {number}', days=days, close_day=10)
+    await update_report_incrementally()
+    for number, days in enumerate((2, 5, 7)):
+        await create_closed_project(f'new {number}', days=days, close_day=20)
+    await update_report_incrementally()
+    requests = sheets_client.requests[-1][2]['requests']
+    assert [
+        request['insertDimension']['range']['startIndex']
+        for request in requests if 'insertDimension' in request
+    ] == [2, 4, 6], (
+        'Позиции новых строк должны совпадать с их местами в полностью '
+        'отсортированном отчете.'
+    )
+
+
+async def test_incremental_report_includes_late_commits(sheets_client):
+    await create_closed_project('first', days=1, close_day=10)
+    await update_report_incrementally()
+    # Проект закрыт раньше выгруженного, но зафиксирован после выгрузки.
+    await create_closed_project('late', days=1, close_day=5)
+    result = await update_report_incrementally()
+    assert result['projects_count'] == 1, (
+        'Инкрементальная выгрузка должна добавлять проекты, закрытые '
+        'раньше уже выгруженных, но зафиксированные позже.'
+    )
+
+
+async def test_incremental_report_rewrites_changed_sheet(sheets_client):
+    await create_closed_project('first', days=1, close_day=10)
+    await update_report_incrementally()
+    sheets_client.rows += 1
+    await create_closed_project('second', days=2, close_day=10)
+    result = await update_report_incrementally()
+    assert result['projects_count'] == 2, (
+        'Если количество строк на листе не совпадает с сохраненным '
+        'состоянием, отчет должен выгружаться целиком.'
+    )
+    requests = sheets_client.requests[-1][2]['requests']
+    assert 'updateCells' in requests[0] and 'range' in requests[0][
+        'updateCells'
+    ], (
+        'Полная выгрузка после расхождения должна перезаписывать лист.'
+    )
+
+
+async def test_full_report_reads_replica_and_increment_primary(
+        sheets_client, tmp_path
+):
+    await create_closed_project('replicated', days=1, close_day=2)
+    replica_engine = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "replica.db"}'
+    )
+    async with engine.connect() as primary, replica_engine.begin() as replica:
+        await replica.run_sync(CharityProject.metadata.create_all)
+        rows = await primary.execute(CharityProject.__table__.select())
+        await replica.execute(
+            CharityProject.__table__.insert(),
+            [dict(row._mapping) for row in rows]
+        )
+    # Проект еще не попал в отстающую реплику.
+    await create_closed_project('lagging', days=2, close_day=3)
+    replica_sessions = sessionmaker(replica_engine, class_=AsyncSession)
+    try:
+        async with TestingSessionLocal() as session, (
+            replica_sessions()
+        ) as read_session:
+            result = await update_google_report(session, read_session)
+    finally:
+        await replica_engine.dispose()
+    assert result['projects_count'] == 1, (
+        'Полная выгрузка должна читать строки отчета из реплики.'
+    )
+    result = await update_report_incrementally()
+    assert result['projects_count'] == 1, (
+        'Инкрементальная выгрузка должна читать основную базу и '
+        'добавлять проекты, которых еще нет в реплике.'
+    )
+
+
+async def test_report_is_sorted_and_limited_in_database():
+    for name, days in (('slow', 5), ('fast', 1), ('medium', 3)):
+        await create_closed_project(name, days=days, close_day=10)
+    async with TestingSessionLocal() as session:
+        report = await charity_project_crud.get_projects_by_completion_rate(
+            session, limit=2
+        )
+    assert [project.name for project in report] == ['fast', 'medium'], (
+        'Отчет должен содержать самые быстрые проекты в порядке '
+        'времени сбора.'
+    )
+    assert report[1].collection_time == '3 дн. 00 ч. 00 мин.', (
+        'Время сбора, вычисленное в базе данных, должно совпадать '
+        'с разностью дат закрытия и создания.'
+    )
+
+
+def test_collection_seconds_compiles_for_postgresql():
+    values = charity_project_crud.get_closing_values(
+        CharityProject.close_date
+    )
+    query = str(values['collection_seconds'].compile(
+        dialect=postgresql.dialect()
+    ))
+    assert 'EXTRACT(EPOCH FROM' in query, (
+        'Для PostgreSQL время сбора должно вычисляться через '
+        '`EXTRACT(EPOCH FROM ...)`.'
+    )
+
+
+async def test_report_query_reads_collection_seconds_index():
+    query = charity_project_crud.get_report_query(limit=10).compile(
+        dialect=engine.dialect, compile_kwargs={'literal_binds': True}
+    )
+    async with engine.connect() as conn:
+        plan = await conn.execute(text(f'EXPLAIN QUERY PLAN {query}'))
+        details = [row[-1] for row in plan]
+    assert any(
+        'ix_charityproject_collection_seconds_id' in detail
+        for detail in details
+    ), (
+        'Запрос отчета должен читать индекс '
+        '`ix_charityproject_collection_seconds_id`.'
+    )
+    assert not any('TEMP B-TREE' in detail for detail in details), (
+        'Строки отчета должны читаться в порядке индекса без сортировки.'
+    )
+
+
+async def test_incremental_report_query_reads_export_indexes():
+    query = report_export_crud.get_unexported_query(1).compile(
+        dialect=engine.dialect, compile_kwargs={'literal_binds': True}
+    )
+    async with engine.connect() as conn:
+        plan = await conn.execute(text(f'EXPLAIN QUERY PLAN {query}'))
+        details = [row[-1] for row in plan]
+    assert any(
+        '(export_id=? AND project_id=?)' in detail for detail in details
+    ), (
+        'Проверка, выгружен ли проект, должна читать уникальный индекс '
+        'по (export_id, project_id).'
+    )
+    assert any(
+        'ix_reportexportrow_export_id_collection_seconds '
+        '(export_id=? AND collection_seconds<?)' in detail
+        for detail in details
+    ), (
+        'Позиция новой строки должна считаться по индексу '
+        '`ix_reportexportrow_export_id_collection_seconds`.'
+    )
+
+
+@pytest.mark.parametrize('projects_count, expected_requests', [
+    (5, 3),
+    (4, 2),
+])
+async def test_large_report_is_written_in_chunks(
+        sheets_client, monkeypatch, projects_count, expected_requests
+):
+    monkeypatch.setattr(settings, 'report_chunk_size', 2)
+    for number in range(projects_count):
+        await create_closed_project(
+            f'project {number}', days=projects_count - number, close_day=10
+        )
+    progress = []
+    async with TestingSessionLocal() as session:
+        _, written = await google_report.export_report(
+            session, on_progress=progress.append
+        )
+    assert written == projects_count, (
+        'Отчет, записанный частями, должен содержать все закрытые проекты.'
+    )
+    assert len(sheets_client.requests) == expected_requests, (
+        'Отчет должен записываться частями не больше `report_chunk_size` '
+        'строк за запрос.'
+    )
+    assert progress == [
+        min(written, 2 * number)
+        for number in range(1, expected_requests + 1)
+    ], (
+        'После каждой части должно сообщаться число записанных строк.'
+    )
+    batches = [body['requests'] for _, _, body in sheets_client.requests]
+    assert 'updateCells' in batches[0][0] and all(
+        'updateCells' not in request
+        for batch in batches[1:] for request in batch
+    ), (
+        'Лист должен очищаться только перед записью первой части отчета.'
+    )
+    assert all(
+        'autoResizeDimensions' not in request
+        for batch in batches[:-1] for request in batch
+    ) and 'autoResizeDimensions' in batches[-1][-1], (
+        'Ширина колонок должна подбираться после записи последней части.'
+    )
+    names = [
+        row['values'][0]['userEnteredValue']['stringValue']
+        for batch in batches for request in batch
+        if 'appendCells' in request
+        for row in request['appendCells']['rows']
+    ]
+    assert names[1:] == [
+        f'project {number}' for number in reversed(range(projects_count))
+    ], (
+        'Части отчета должны идти в порядке скорости сбора средств.'
+    )
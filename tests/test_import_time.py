@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+APP_IMPORT_BUDGET_SECONDS = 3
+LAZY_MODULES = ('gspread', 'google.auth', 'google.oauth2')
+
+
+def import_app_main():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app.main'],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, module = line.split('|')
+        if cumulative.strip().isdigit():
+            timings[module.strip()] = int(cumulative) / 1_000_000
+    return timings
+
+
+def test_app_import_does_not_load_google_stack():
+    timings = import_app_main()
+    assert 'app.main' in timings, (
+        'Не удалось измерить время импорта `app.main`.'
+    )
+    loaded = [module for module in LAZY_MODULES if module in timings]
+    assert not loaded, (
+        'Библиотеки Google должны импортироваться при первом обращении, '
+        f'а не при запуске приложения: `{"`, `".join(loaded)}`.'
+    )
+    assert timings['app.main'] < APP_IMPORT_BUDGET_SECONDS, (
+        f'Импорт `app.main` занял {timings["app.main"]:.2f} с, больше '
+        f'допустимых {APP_IMPORT_BUDGET_SECONDS} с.'
+    )
@@ -1,6 +1,31 @@
+import asyncio
+import os
+import random
+
 import pytest
+import pytest_asyncio
+from conftest import Base, TestingSessionLocal, app, current_user, engine
+from fixtures.user import superuser
+from pydantic import ValidationError
+from sqlalchemy import event, func, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import Settings, settings
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.donation import DonationCreate
+from app.service import donations
+from app.service.donations import (
+    create_with_investment, invest_batch_from_open_pool,
+    invest_from_open_pool
+)
+from app.service.open_pool import open_pool_cache
 
 DONATION_URL = '/donation/'
+POSTGRES_TEST_URL = os.getenv('POSTGRES_TEST_URL')
 PROJECTS_URL = '/charity_project/'
 
 
@@ -60,3 +85,479 @@ def test_donation_to_little_invest_project(
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+@pytest.mark.parametrize('crud', [charity_project_crud, donation_crud])
+async def test_open_objects_query_uses_index(crud):
+    query = crud.get_open_objects_query().compile(
+        dialect=engine.dialect, compile_kwargs={'literal_binds': True}
+    )
+    async with engine.connect() as conn:
+        plan = await conn.execute(text(f'EXPLAIN QUERY PLAN {query}'))
+        details = ' '.join(row[-1] for row in plan)
+    index_name = f'ix_{crud.model.__tablename__}_fully_invested_create_date'
+    assert index_name in details, (
+        'Выборка открытых объектов для инвестирования должна использовать '
+        f'индекс `{index_name}`, а не полный просмотр таблицы.'
+    )
+
+
+async def test_small_donation_loads_only_first_batch():
+    projects_count = settings.invest_batch_size * 4
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            CharityProject(
+                name=f'project {number}',
+                description='Открытый проект',
+                full_amount=100,
+            )
+            for number in range(projects_count)
+        ])
+        await session.commit()
+    loaded_projects = []
+
+    def count_load(target, context):
+        loaded_projects.append(target)
+
+    event.listen(CharityProject, 'load', count_load)
+    try:
+        async with TestingSessionLocal() as session:
+            donation = Donation(user_id=2, full_amount=500)
+            session.add(donation)
+            modified_objects = await invest_from_open_pool(
+                donation, charity_project_crud, session
+            )
+    finally:
+        event.remove(CharityProject, 'load', count_load)
+    assert donation.fully_invested and len(modified_objects) == 6, (
+        'Пожертвование на 500 должно полностью распределиться '
+        'по пяти первым проектам на 100.'
+    )
+    assert len(loaded_projects) <= settings.invest_batch_size, (
+        'При распределении пожертвования открытые проекты должны '
+        'читаться из базы пачками, а не загружаться целиком.'
+    )
+
+
+async def test_large_donation_closes_projects_with_one_update():
+    projects_count = settings.invest_batch_size * 3
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            CharityProject(
+                name=f'project {number}',
+                description='Открытый проект',
+                full_amount=10,
+            )
+            for number in range(projects_count)
+        ])
+        await session.commit()
+    project_updates = []
+
+    def count_update(conn, cursor, statement, parameters, context,
+                     executemany):
+        if statement.startswith('UPDATE charityproject'):
+            project_updates.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_update)
+    try:
+        async with TestingSessionLocal() as session:
+            donation = Donation(user_id=2, full_amount=projects_count * 10)
+            session.add(donation)
+            await invest_from_open_pool(
+                donation, charity_project_crud, session
+            )
+            await session.commit()
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', count_update
+        )
+    assert len(project_updates) == 1, (
+        'Результаты инвестирования должны записываться в проекты '
+        'одним пакетным UPDATE.'
+    )
+    async with TestingSessionLocal() as session:
+        closed_count = await session.scalar(
+            select(func.count(CharityProject.id)).where(
+                CharityProject.fully_invested.is_(True),
+                CharityProject.invested_amount == 10,
+                CharityProject.close_date.is_not(None),
+            )
+        )
+    assert closed_count == projects_count, (
+        'Все проекты, закрытые пожертвованием, должны сохраниться в базе '
+        'с полной суммой и датой закрытия.'
+    )
+
+
+async def replay_workload(operations):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    open_pool_cache.invalidate()
+    for number, (kind, full_amount) in enumerate(operations):
+        async with TestingSessionLocal() as session:
+            if kind == 'project':
+                target = CharityProject(
+                    name=f'project {number}',
+                    description='Проект из случайной нагрузки',
+                    full_amount=full_amount,
+                )
+                source_crud = donation_crud
+            else:
+                target = Donation(user_id=2, full_amount=full_amount)
+                source_crud = charity_project_crud
+            session.add(target)
+            await invest_from_open_pool(target, source_crud, session)
+            await session.commit()
+            open_pool_cache.apply_pending(session)
+    state = []
+    async with TestingSessionLocal() as session:
+        for model in (CharityProject, Donation):
+            rows = await session.execute(
+                select(
+                    model.id, model.invested_amount, model.fully_invested
+                ).order_by(model.id)
+            )
+            state.append(rows.all())
+    return state
+
+
+@pytest.mark.parametrize('seed', range(5))
+async def test_sql_engine_matches_python_engine(seed, monkeypatch):
+    generator = random.Random(seed)
+    operations = [
+        (
+            generator.choice(['project', 'donation']),
+            generator.randint(1, 1000),
+        )
+        for _ in range(40)
+    ]
+    monkeypatch.setattr(settings, 'invest_engine', 'python')
+    python_state = await replay_workload(operations)
+    monkeypatch.setattr(settings, 'invest_engine', 'sql')
+    sql_state = await replay_workload(operations)
+    assert sql_state == python_state, (
+        'Распределение средств в базе данных (`invest_engine=sql`) должно '
+        'давать те же `invested_amount` и `fully_invested`, что и перебор '
+        'в Python.'
+    )
+    monkeypatch.setattr(settings, 'invest_engine', 'python')
+    monkeypatch.setattr(settings, 'open_pool_cache', True)
+    cached_state = await replay_workload(operations)
+    open_pool_cache.invalidate()
+    assert cached_state == python_state, (
+        'Распределение средств по кэшу незакрытых объектов '
+        '(`open_pool_cache`) должно давать те же `invested_amount` и '
+        '`fully_invested`, что и чтение незакрытых объектов из базы.'
+    )
+
+
+@pytest.mark.parametrize('invest_engine', ['python', 'sql', 'cache'])
+async def test_closed_projects_store_collection_seconds(
+        invest_engine, monkeypatch
+):
+    if invest_engine == 'cache':
+        monkeypatch.setattr(settings, 'open_pool_cache', True)
+    else:
+        monkeypatch.setattr(settings, 'invest_engine', invest_engine)
+    generator = random.Random(invest_engine)
+    await replay_workload([
+        (generator.choice(['project', 'donation']), generator.randint(1, 300))
+        for _ in range(40)
+    ])
+    open_pool_cache.invalidate()
+    async with TestingSessionLocal() as session:
+        rows = (await session.execute(
+            select(
+                CharityProject.create_date,
+                CharityProject.close_date,
+                CharityProject.collection_seconds,
+            ).where(CharityProject.fully_invested.is_(True))
+        )).all()
+    assert rows, 'Нагрузка должна закрыть хотя бы один проект.'
+    for create_date, close_date, collection_seconds in rows:
+        assert collection_seconds == pytest.approx(
+            (close_date - create_date).total_seconds(), abs=1e-3
+        ), (
+            'При закрытии проекта в `collection_seconds` должно '
+            'сохраняться время сбора средств.'
+        )
+    async with TestingSessionLocal() as session:
+        open_projects = await session.scalar(
+            select(func.count()).where(
+                CharityProject.fully_invested.is_(False),
+                CharityProject.collection_seconds.is_not(None),
+            )
+        )
+    assert not open_projects, (
+        'У незакрытых проектов `collection_seconds` должно быть пустым.'
+    )
+
+
+async def check_parallel_donations(session_factory, seed):
+    generator = random.Random(seed)
+    async with session_factory() as session:
+        session.add_all([
+            CharityProject(
+                name=f'project {number}',
+                description='Открытый проект',
+                full_amount=generator.randint(100, 1000),
+            )
+            for number in range(50)
+        ])
+        await session.commit()
+
+    async def donate(full_amount):
+        async with session_factory() as session:
+            await create_with_investment(
+                DonationCreate(full_amount=full_amount),
+                donation_crud,
+                charity_project_crud,
+                session,
+                user,
+            )
+
+    user = User(id=2)
+    await asyncio.gather(*[
+        donate(generator.randint(1, 500)) for _ in range(300)
+    ])
+    async with session_factory() as session:
+        overfunded = await session.scalar(
+            select(func.count(CharityProject.id)).where(
+                CharityProject.invested_amount > CharityProject.full_amount
+            )
+        )
+        invested_in_projects = await session.scalar(
+            select(func.sum(CharityProject.invested_amount))
+        )
+        invested_from_donations = await session.scalar(
+            select(func.sum(Donation.invested_amount))
+        )
+    assert overfunded == 0, (
+        'При параллельных пожертвованиях ни один проект не должен получить '
+        'больше средств, чем указано в `full_amount`.'
+    )
+    assert invested_in_projects == invested_from_donations, (
+        'При параллельных пожертвованиях сумма, внесенная в проекты, '
+        'должна совпадать с суммой, распределенной из пожертвований.'
+    )
+
+
+@pytest.mark.parametrize('invest_engine', ['python', 'sql', 'cache'])
+async def test_parallel_donations_do_not_overfund_projects(
+        invest_engine, monkeypatch
+):
+    if invest_engine == 'cache':
+        monkeypatch.setattr(settings, 'open_pool_cache', True)
+        open_pool_cache.invalidate()
+    else:
+        monkeypatch.setattr(settings, 'invest_engine', invest_engine)
+    await check_parallel_donations(TestingSessionLocal, invest_engine)
+    open_pool_cache.invalidate()
+
+
+@pytest_asyncio.fixture
+async def postgres_session_factory():
+    if not POSTGRES_TEST_URL:
+        pytest.skip('Не задан адрес тестовой базы PostgreSQL')
+    postgres_engine = create_async_engine(POSTGRES_TEST_URL, pool_size=20)
+    async with postgres_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(
+        postgres_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with postgres_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await postgres_engine.dispose()
+
+
+@pytest.mark.postgresql
+@pytest.mark.parametrize('invest_engine', ['python', 'sql'])
+async def test_parallel_donations_lock_rows_in_postgresql(
+        invest_engine, postgres_session_factory, monkeypatch
+):
+    monkeypatch.setattr(settings, 'invest_engine', invest_engine)
+    await check_parallel_donations(postgres_session_factory, invest_engine)
+
+
+def conflict_error():
+    return DBAPIError(
+        'UPDATE charityproject', {}, Exception('database is locked')
+    )
+
+
+def test_investment_retries_conflicts(user_client, monkeypatch):
+    attempts = []
+
+    async def invest_with_conflict(targets, source_crud, session):
+        attempts.append(len(attempts) + 1)
+        if len(attempts) == 1:
+            raise conflict_error()
+        return await invest_batch_from_open_pool(
+            targets, source_crud, session
+        )
+
+    monkeypatch.setattr(
+        donations, 'invest_batch_from_open_pool', invest_with_conflict
+    )
+    response = user_client.post(DONATION_URL, json={'full_amount': 100})
+    assert response.status_code == 200 and attempts == [1, 2], (
+        'При конфликте параллельных транзакций распределение должно '
+        'повторяться.'
+    )
+
+
+def test_persistent_conflict_returns_409(user_client, monkeypatch):
+    async def invest_with_conflict(targets, source_crud, session):
+        raise conflict_error()
+
+    monkeypatch.setattr(
+        donations, 'invest_batch_from_open_pool', invest_with_conflict
+    )
+    response = user_client.post(DONATION_URL, json={'full_amount': 100})
+    assert response.status_code == 409, (
+        'Если конфликт сохраняется во всех попытках, должна возвращаться '
+        'ошибка 409.'
+    )
+
+
+def test_invest_max_retries_must_be_positive():
+    with pytest.raises(ValidationError):
+        Settings(invest_max_retries=0)
+
+
+@pytest.fixture
+def cached_open_pool(monkeypatch):
+    monkeypatch.setattr(settings, 'open_pool_cache', True)
+    open_pool_cache.invalidate()
+    yield open_pool_cache
+    open_pool_cache.invalidate()
+
+
+async def donate_with_investment(full_amount):
+    async with TestingSessionLocal() as session:
+        await create_with_investment(
+            DonationCreate(full_amount=full_amount),
+            donation_crud,
+            charity_project_crud,
+            session,
+            User(id=2),
+        )
+
+
+async def test_cached_open_pool_skips_pool_query(cached_open_pool):
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            CharityProject(
+                name=f'project {number}',
+                description='Открытый проект',
+                full_amount=100,
+            )
+            for number in range(3)
+        ])
+        await session.commit()
+    await donate_with_investment(150)
+    project_selects = []
+
+    def count_select(conn, cursor, statement, parameters, context,
+                     executemany):
+        if statement.startswith('SELECT') and 'FROM charityproject' in (
+            statement
+        ):
+            project_selects.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_select)
+    try:
+        await donate_with_investment(100)
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', count_select
+        )
+    assert not project_selects, (
+        'При включенном кэше незакрытых объектов пожертвование не должно '
+        'запрашивать список открытых проектов из базы.'
+    )
+    async with TestingSessionLocal() as session:
+        invested = await session.execute(
+            select(CharityProject.invested_amount).order_by(CharityProject.id)
+        )
+    assert invested.scalars().all() == [100, 100, 50], (
+        'Пожертвования по кэшу незакрытых объектов должны распределяться '
+        'по проектам в порядке их создания.'
+    )
+
+
+async def test_cached_open_pool_falls_back_on_mismatch(cached_open_pool):
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            CharityProject(
+                name=f'project {number}',
+                description='Открытый проект',
+                full_amount=100,
+            )
+            for number in range(2)
+        ])
+        await session.commit()
+    await donate_with_investment(50)
+    async with TestingSessionLocal() as session:
+        project = await session.get(CharityProject, 1)
+        project.invested_amount = 90
+        await session.commit()
+    await donate_with_investment(30)
+    async with TestingSessionLocal() as session:
+        invested = await session.execute(
+            select(CharityProject.invested_amount).order_by(CharityProject.id)
+        )
+    assert invested.scalars().all() == [100, 20], (
+        'При расхождении кэша незакрытых объектов с базой распределение '
+        'должно повторяться по данным из базы.'
+    )
+
+
+async def create_open_project(name):
+    async with TestingSessionLocal() as session:
+        session.add(CharityProject(
+            name=name, description='Открытый проект', full_amount=100
+        ))
+        await session.commit()
+
+
+@pytest.mark.parametrize('options', [
+    {'database_url': 'postgresql+asyncpg://localhost/qrkot'},
+    {'web_concurrency': 4},
+], ids=['postgresql', 'workers'])
+def test_open_pool_cache_requires_single_sqlite_process(options):
+    with pytest.raises(ValidationError):
+        Settings(open_pool_cache=True, **options)
+
+
+async def test_cached_open_pool_expires(cached_open_pool, monkeypatch):
+    await create_open_project('project')
+    await donate_with_investment(10)
+    pool = cached_open_pool.peek(CharityProject)
+    await donate_with_investment(10)
+    assert cached_open_pool.peek(CharityProject) is pool, (
+        'Пока пул не устарел, он не должен перечитываться из базы.'
+    )
+    monkeypatch.setattr(settings, 'open_pool_cache_ttl', 0)
+    await donate_with_investment(10)
+    assert cached_open_pool.peek(CharityProject) is not pool, (
+        'Устаревший пул незакрытых объектов должен перечитываться '
+        'из базы.'
+    )
+
+
+@pytest.mark.usefixtures('charity_project')
+def test_project_update_invalidates_open_pool(superuser_client,
+                                              cached_open_pool):
+    app.dependency_overrides[current_user] = lambda: superuser
+    superuser_client.post(DONATION_URL, json={'full_amount': 100})
+    assert cached_open_pool.peek(CharityProject) is not None, (
+        'При включенном кэше пожертвование должно загружать пул открытых '
+        'проектов.'
+    )
+    superuser_client.patch(PROJECTS_URL + '1', json={'full_amount': 500})
+    assert cached_open_pool.peek(CharityProject) is None, (
+        'Изменение проекта должно сбрасывать кэш открытых проектов.'
+    )
@@ -0,0 +1,120 @@
+import re
+
+import pytest
+from conftest import engine
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.api.endpoints import donation as donation_endpoints
+from app.core.config import settings
+from app.core.metrics import (QUERY_START_KEY, RequestStats,
+                              current_request_stats, instrument_engine,
+                              route_stats)
+
+
+@pytest.fixture(autouse=True)
+def instrumented_engine():
+    instrument_engine(engine)
+
+
+def test_debug_headers(superuser_client, monkeypatch):
+    monkeypatch.setattr(settings, 'debug', True)
+    response = superuser_client.get('/charity_project/')
+    assert response.status_code == 200
+    assert int(response.headers['X-DB-Statements']) == 1, (
+        'В режиме отладки в заголовке `X-DB-Statements` должно '
+        'передаваться количество SQL-запросов.'
+    )
+    assert float(response.headers['X-DB-Time']) >= float(
+        response.headers['X-DB-Slowest-Time']
+    ) > 0
+
+
+def test_no_debug_headers(superuser_client):
+    response = superuser_client.get('/charity_project/')
+    assert 'X-DB-Statements' not in response.headers, (
+        'Вне режима отладки статистика SQL-запросов не должна '
+        'передаваться в заголовках.'
+    )
+
+
+def test_prometheus_metrics(superuser_client):
+    superuser_client.post('/charity_project/', json={
+        'name': 'project', 'description': 'description', 'full_amount': 100,
+    })
+    response = superuser_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    statements = re.search(
+        r'^qrkot_db_statements_total'
+        r'\{method="POST",route="/charity_project/"\} (\d+)$',
+        response.text,
+        re.MULTILINE,
+    )
+    assert statements and int(statements.group(1)) > 0, (
+        'Метрики должны содержать количество SQL-запросов по маршрутам.'
+    )
+    assert re.search(
+        r'^qrkot_db_pool_checked_out\{engine="primary"\} \d+$',
+        response.text,
+        re.MULTILINE,
+    ), 'Метрики должны содержать состояние пула соединений.'
+
+
+@pytest.mark.usefixtures('donation')
+def test_streamed_response_metrics(superuser_client, monkeypatch):
+    stream_json_array = donation_endpoints.stream_json_array
+
+    async def stream_with_query(result, schema):
+        async for chunk in stream_json_array(result, schema):
+            yield chunk
+        async with engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    monkeypatch.setattr(
+        donation_endpoints, 'stream_json_array', stream_with_query
+    )
+    monkeypatch.delitem(route_stats, ('GET', '/donation/'), raising=False)
+    response = superuser_client.get('/donation/', params={'stream': True})
+    assert len(response.json()) == 1
+    stats = route_stats['GET', '/donation/']
+    assert stats.requests == 1 and stats.statements >= 2, (
+        'Статистика потокового ответа должна учитывать SQL-запросы, '
+        'выполненные при отправке тела ответа.'
+    )
+
+
+@pytest.mark.parametrize('client_name, status_code', [
+    ('test_client', 401),
+    ('user_client', 403),
+])
+def test_prometheus_metrics_require_superuser(
+        request, client_name, status_code
+):
+    client = request.getfixturevalue(client_name)
+    response = client.get('/metrics')
+    assert response.status_code == status_code, (
+        'Метрики должны быть доступны только суперюзеру.'
+    )
+    assert 'qrkot_' not in response.text
+
+
+async def test_failed_statement_releases_timing_slot():
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    try:
+        async with engine.connect() as connection:
+            info = connection.sync_connection.info
+            with pytest.raises(DBAPIError):
+                await connection.exec_driver_sql('SELECT * FROM missing')
+            assert QUERY_START_KEY not in info, (
+                'Время начала запроса с ошибкой не должно оставаться '
+                'в соединении.'
+            )
+            await connection.exec_driver_sql('SELECT 1')
+            assert QUERY_START_KEY not in info
+    finally:
+        current_request_stats.reset(token)
+    assert stats.statements == 2, (
+        'Запрос, завершившийся ошибкой, тоже должен учитываться.'
+    )
@@ -0,0 +1,54 @@
+import pytest
+
+
+def selects_after_write(statements, table):
+    writes = [
+        number for number, statement in enumerate(statements)
+        if statement.startswith((f'INSERT INTO {table}', f'UPDATE {table}'))
+    ]
+    assert writes, f'Запрос не изменил таблицу `{table}`.'
+    return [
+        statement for statement in statements[writes[-1] + 1:]
+        if statement.startswith('SELECT') and f'FROM {table}' in statement
+    ]
+
+
+@pytest.mark.parametrize('url, json, table', [
+    ('/donation/', {'full_amount': 100}, 'donation'),
+    ('/donation/batch', [{'full_amount': 100}] * 2, 'donation'),
+])
+def test_donation_create_does_not_reread_rows(
+        user_client, query_counter, url, json, table
+):
+    query_counter.clear()
+    response = user_client.post(url, json=json)
+    assert response.status_code == 200
+    assert not selects_after_write(query_counter, table), (
+        'После коммита созданные пожертвования не должны читаться '
+        'из базы данных повторно.'
+    )
+
+
+def test_charity_project_writes_do_not_reread_rows(
+        superuser_client, query_counter
+):
+    query_counter.clear()
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'project', 'description': 'description', 'full_amount': 100,
+    })
+    assert response.status_code == 200
+    assert not selects_after_write(query_counter, 'charityproject'), (
+        'После коммита созданный проект не должен читаться '
+        'из базы данных повторно.'
+    )
+    query_counter.clear()
+    response = superuser_client.patch(
+        f'/charity_project/{response.json()["id"]}',
+        json={'full_amount': 200},
+    )
+    assert response.status_code == 200
+    assert response.json()['full_amount'] == 200
+    assert not selects_after_write(query_counter, 'charityproject'), (
+        'После коммита обновленный проект не должен читаться '
+        'из базы данных повторно.'
+    )
@@ -0,0 +1,47 @@
+import pytest_asyncio
+from conftest import app
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import db
+from app.core.db import get_async_read_session
+from app.models import CharityProject
+
+
+@pytest_asyncio.fixture
+async def replica_session_factory(tmp_path):
+    replica_engine = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "replica.db"}'
+    )
+    async with replica_engine.begin() as connection:
+        await connection.run_sync(CharityProject.metadata.create_all)
+        await connection.execute(
+            CharityProject.__table__.insert(),
+            {'name': 'replica', 'description': 'replica', 'full_amount': 100},
+        )
+    yield sessionmaker(replica_engine, class_=AsyncSession)
+    await replica_engine.dispose()
+
+
+def test_read_engine_falls_back_to_primary():
+    assert db.read_engine is db.engine, (
+        'Без адреса реплики сессии чтения должны использовать основную базу.'
+    )
+
+
+def test_listing_reads_from_replica(superuser_client, replica_session_factory):
+    async def override_read_db():
+        async with replica_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_read_session] = override_read_db
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'primary', 'description': 'primary', 'full_amount': 100,
+    })
+    assert response.status_code == 200, (
+        'Создание проекта должно выполняться в основной базе данных.'
+    )
+    response = superuser_client.get('/charity_project/')
+    assert [project['name'] for project in response.json()] == [
+        'replica'
+    ], 'Список проектов должен читаться из реплики базы данных.'
@@ -0,0 +1,93 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.db import configure_sqlite
+from app.crud.charity_project import charity_project_crud
+from app.models import CharityProject, Donation
+
+WRITES = 50
+
+
+def create_engine(path):
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}')
+    configure_sqlite(engine)
+    return engine
+
+
+async def test_sqlite_pragmas(tmp_path):
+    engine = create_engine(tmp_path / 'pragmas.db')
+    try:
+        async with engine.connect() as connection:
+            journal_mode = await connection.scalar(
+                text('PRAGMA journal_mode')
+            )
+            synchronous = await connection.scalar(text('PRAGMA synchronous'))
+            busy_timeout = await connection.scalar(
+                text('PRAGMA busy_timeout')
+            )
+            cache_size = await connection.scalar(text('PRAGMA cache_size'))
+    finally:
+        await engine.dispose()
+    assert journal_mode == 'wal', (
+        'Соединения с SQLite должны использовать журнал WAL.'
+    )
+    assert synchronous == 1, (
+        'Соединения с SQLite должны использовать synchronous=NORMAL.'
+    )
+    assert busy_timeout == settings.sqlite_busy_timeout
+    assert cache_size == settings.sqlite_cache_size
+
+
+async def test_sqlite_reads_while_donations_commit(tmp_path):
+    engine = create_engine(tmp_path / 'concurrent.db')
+    async with engine.begin() as connection:
+        await connection.run_sync(CharityProject.metadata.create_all)
+        await connection.execute(
+            CharityProject.__table__.insert(),
+            [{'name': f'project {number}', 'description': 'description',
+              'full_amount': 100} for number in range(10)],
+        )
+    reads = 0
+    try:
+        async with engine.connect() as reader:
+            # Открытая транзакция чтения при журнале отката
+            # не дала бы писателю закоммитить изменения.
+            await reader.exec_driver_sql('BEGIN')
+            reader_session = AsyncSession(bind=reader)
+
+            async def write_donations():
+                for _ in range(WRITES):
+                    async with AsyncSession(engine) as session:
+                        session.add(Donation(full_amount=1, user_id=1))
+                        await session.commit()
+                    await asyncio.sleep(0)
+
+            async def read_projects():
+                nonlocal reads
+                while not writes.done():
+                    projects = await charity_project_crud.get_multi(
+                        reader_session
+                    )
+                    assert len(projects) == 10
+                    reads += 1
+                    await asyncio.sleep(0)
+
+            writes = asyncio.create_task(write_donations())
+            await asyncio.wait_for(
+                asyncio.gather(writes, read_projects()), timeout=10
+            )
+        async with engine.connect() as connection:
+            donations = await connection.scalar(
+                text('SELECT count(*) FROM donation')
+            )
+    finally:
+        await engine.dispose()
+    assert donations == WRITES, (
+        'Пожертвования должны сохраняться во время чтения списка проектов.'
+    )
+    assert reads > 0, (
+        'Список проектов должен читаться во время записи пожертвований.'
+    )